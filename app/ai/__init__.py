@@ -1,3 +1,3 @@
 """Claude and AI orchestration components."""
 
-__all__ = ["claude_client", "playlist_planner"]
+__all__ = ["claude_client", "local_index", "playlist_planner", "track_searcher", "tracks"]
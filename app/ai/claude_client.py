@@ -2,9 +2,32 @@
 
 from __future__ import annotations
 
+import asyncio
+import logging
 from functools import lru_cache
 
-from anthropic import AsyncAnthropic
+from anthropic import DEFAULT_CONNECTION_LIMITS, AsyncAnthropic, DefaultAsyncHttpxClient, Timeout
+from anthropic.types import CacheControlEphemeralParam
+
+from ..config import load_settings
+
+logger = logging.getLogger(__name__)
+
+# Claude requests are slow and bursty, so keep warm sockets around between them and
+# let concurrent requests multiplex over HTTP/2 instead of opening new connections.
+# Built from the SDK's own Limits class: newer SDK releases use httpx2, whose config
+# objects are not interchangeable with httpx ones.
+HTTP_LIMITS = type(DEFAULT_CONNECTION_LIMITS)(
+    max_connections=64, max_keepalive_connections=32, keepalive_expiry=60.0
+)
+HTTP_TIMEOUT = Timeout(60.0, connect=5.0)
+WARM_UP_URL = "https://api.anthropic.com/v1/messages"
+# The SDK retries 429/5xx responses with jittered exponential backoff and honours
+# retry-after; two retries (the default) is too few to ride out a burst of /mix requests.
+MAX_RETRIES = 4
+
+# Marks the end of a static prompt prefix that Anthropic may serve from its prompt cache
+CACHE_CONTROL: CacheControlEphemeralParam = {"type": "ephemeral"}
 
 
 class ClaudeConfigurationError(RuntimeError):
@@ -12,12 +35,67 @@ class ClaudeConfigurationError(RuntimeError):
 
 
 @lru_cache(maxsize=1)
+def _get_http_client() -> DefaultAsyncHttpxClient:
+    return DefaultAsyncHttpxClient(http2=True, limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT)
+
+
+@lru_cache(maxsize=4)
 def get_client(api_key: str | None) -> AsyncAnthropic:
-    """Return a cached AsyncAnthropic client configured with the given API key."""
+    """Return a cached AsyncAnthropic client configured with the given API key.
+
+    Clients are cached per key and all share one connection pool.
+    """
 
     if api_key is None or not api_key.strip():
         raise ClaudeConfigurationError("ANTHROPIC_API_KEY must be configured to use Claude.")
-    return AsyncAnthropic(api_key=api_key.strip())
+    return AsyncAnthropic(
+        api_key=api_key.strip(), http_client=_get_http_client(), max_retries=MAX_RETRIES
+    )
+
+
+async def warm_up() -> None:
+    """Open (or keep alive) a pooled connection to the Claude API; the response is ignored."""
+
+    try:
+        await _get_http_client().head(WARM_UP_URL)
+    except Exception as exc:  # the HTTP library's error types depend on the SDK version
+        logger.debug("Claude connection warm-up failed: %s", exc)
+
+
+async def close_client() -> None:
+    """Close the shared Claude connection pool; a later get_client() starts a new one."""
+
+    if _get_http_client.cache_info().currsize:
+        await _get_http_client().aclose()
+    _get_http_client.cache_clear()
+    get_client.cache_clear()
+
+
+@lru_cache(maxsize=8)
+def resolve_model(model: str | None) -> str:
+    """Return ``model`` or the configured default, rejecting blank names."""
+
+    resolved = (model or load_settings().anthropic_model).strip()
+    if not resolved:
+        raise ClaudeConfigurationError("Anthropic model must be configured.")
+    return resolved
+
+
+@lru_cache(maxsize=8)
+def get_request_limiter(max_concurrency: int) -> asyncio.Semaphore:
+    """Return a process-wide semaphore bounding concurrent Claude requests."""
+
+    if max_concurrency < 1:
+        raise ClaudeConfigurationError("Claude max concurrency must be at least 1.")
+    return asyncio.Semaphore(max_concurrency)
 
 
-__all__ = ["ClaudeConfigurationError", "get_client"]
+__all__ = [
+    "CACHE_CONTROL",
+    "ClaudeConfigurationError",
+    "close_client",
+    "get_client",
+    "get_request_limiter",
+    "resolve_model",
+    "warm_up",
+]
@@ -0,0 +1,70 @@
+"""In-memory index of recently matched tracks, used to answer repeat /search queries."""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+
+from .tracks import PlannedTrack
+
+# Bounded so a long-running bot can't grow the index without limit; it is rebuilt from
+# fresh matches after a reset.
+MAX_INDEXED_TRACKS = 10_000
+# A single token ("creep") is too ambiguous to skip Claude on.
+MIN_MATCH_TOKENS = 2
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def _tokenize(text: str) -> list[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
+@dataclass(slots=True)
+class _Node:
+    children: dict[str, _Node] = field(default_factory=dict)
+    track: PlannedTrack | None = None
+
+
+class TrackIndex:
+    """Trie of ``artist title`` token sequences mapped to the track they came from."""
+
+    def __init__(self, *, max_tracks: int = MAX_INDEXED_TRACKS) -> None:
+        self._root = _Node()
+        self._size = 0
+        self._max_tracks = max_tracks
+
+    def __len__(self) -> int:
+        return self._size
+
+    def insert(self, track: PlannedTrack) -> None:
+        """Index ``track`` under its lower-cased ``artist title`` tokens."""
+        tokens = _tokenize(f"{track.artist} {track.title}")
+        if len(tokens) < MIN_MATCH_TOKENS:
+            return
+        if self._size >= self._max_tracks:
+            self._root = _Node()
+            self._size = 0
+
+        node = self._root
+        for token in tokens:
+            node = node.children.setdefault(token, _Node())
+        if node.track is None:
+            self._size += 1
+        node.track = track
+
+    def match(self, text: str) -> PlannedTrack | None:
+        """Return the track whose tokens form the longest prefix of ``text``, if any."""
+        node = self._root
+        best: PlannedTrack | None = None
+        for depth, token in enumerate(_tokenize(text), start=1):
+            child = node.children.get(token)
+            if child is None:
+                break
+            node = child
+            if node.track is not None and depth >= MIN_MATCH_TOKENS:
+                best = node.track
+        return best
+
+
+__all__ = ["TrackIndex"]
@@ -3,18 +3,29 @@
 from __future__ import annotations
 
 import logging
+from collections.abc import Awaitable, Callable
 from dataclasses import dataclass
+from typing import Any
 
 from anthropic import AsyncAnthropic
-from anthropic.types import WebSearchTool20250305Param
-
-from ..config import load_settings
-from .claude_client import ClaudeConfigurationError, get_client
+from anthropic.types import TextBlockParam, WebSearchTool20250305Param
+
+from ..config import DEFAULT_ANTHROPIC_MAX_CONCURRENCY
+from .claude_client import (
+    CACHE_CONTROL,
+    ClaudeConfigurationError,
+    get_client,
+    get_request_limiter,
+    resolve_model,
+)
+from .tracks import PlannedTrack, parse_track_line
 
 logger = logging.getLogger(__name__)
 
 MAX_TRACKS = 25
 MAX_OUTPUT_TOKENS = 4096  # Increased to accommodate web search results
+# 25 lines of "artist - song" average ~30 tokens each, so ~750 tokens plus headroom
+MAX_OUTPUT_TOKENS_WITHOUT_SEARCH = 1200
 TEMPERATURE = 0.7
 
 # Web search tool definition for up-to-date music information
@@ -49,18 +60,16 @@ CRITICAL OUTPUT REQUIREMENTS:
 - Your FINAL output MUST be a simple list of songs in 'artist - song' format, one per line
 - No explanations, no numbering, no markdown - ONLY the song list"""
 
-USER_PROMPT_TEMPLATE = """Create a playlist of exactly 25 songs based on the following information.
-
-=== USER REQUEST ===
-{context}
+# Static instructions are sent as their own content block so they can be served from
+# Anthropic's prompt cache together with the system prompt and tool definitions.
+USER_PROMPT_INSTRUCTIONS = """Create a playlist of exactly 25 songs based on the user request and
+music preferences that follow these instructions.
 
-CRITICAL: Analyze EVERY word in this request. Each word shapes the mood, setting, activity,
+CRITICAL: Analyze EVERY word in the request. Each word shapes the mood, setting, activity,
 time of day, emotional state, and cultural context. Do NOT just pick songs with the main
 keyword in the title or lyrics. Instead, capture the complete essence of what the user is
 asking for.
 
-{user_preferences}
-
 === YOUR TASK ===
 Curate 25 songs that:
 1. Match the COMPLETE meaning and nuance of the request, not just keywords
@@ -83,15 +92,18 @@ Example format:
 The Beatles - Hey Jude
 Pink Floyd - Comfortably Numb"""
 
+USER_PROMPT_TEMPLATE = """=== USER REQUEST ===
+{context}
 
-class PlaylistPlannerError(RuntimeError):
-    """Raised when the playlist planner fails to produce a valid result."""
+{user_preferences}"""
+
+SYSTEM_BLOCKS: list[TextBlockParam] = [
+    {"type": "text", "text": SYSTEM_PROMPT, "cache_control": CACHE_CONTROL},
+]
 
 
-@dataclass(slots=True, frozen=True)
-class PlannedTrack:
-    title: str
-    artist: str
+class PlaylistPlannerError(RuntimeError):
+    """Raised when the playlist planner fails to produce a valid result."""
 
 
 @dataclass(slots=True)
@@ -99,47 +111,25 @@ class PlaylistPlan:
     tracks: list[PlannedTrack]
 
 
-def _parse_tracks(raw: str) -> PlaylistPlan:
-    """Parse simple 'artist - song' format from Claude response."""
-    logger.info("Parsing Claude response: %s characters", len(raw))
-    logger.debug("Raw response: %s", raw[:500])  # Log first 500 chars
-
-    text = raw.strip()
-    # Remove markdown code blocks if present
-    if text.startswith("```") and text.endswith("```"):
-        logger.debug("Removing markdown code block wrapper")
-        lines = text.split("\n")
-        text = "\n".join(lines[1:-1])
+TrackCallback = Callable[[PlannedTrack], Awaitable[None]]
 
-    planned: list[PlannedTrack] = []
-    for line_num, line in enumerate(text.split("\n"), start=1):
-        line = line.strip()
-        if not line:
-            continue
 
-        # Remove numbering if present (e.g., "1. ", "1) ")
-        line = line.lstrip("0123456789.)-• ")
+async def _collect_track(
+    line: str, planned: list[PlannedTrack], on_track: TrackCallback | None
+) -> None:
+    """Parse a streamed line and record the track, notifying the callback if any."""
+    if len(planned) >= MAX_TRACKS:
+        return
+    track = parse_track_line(line)
+    if track is None:
+        return
+    planned.append(track)
+    if on_track is not None:
+        await on_track(track)
 
-        # Split by " - " to separate artist and song
-        parts = line.split(" - ", 1)
-        if len(parts) != 2:
-            logger.warning("Line %d: Invalid format (no ' - ' separator): %s", line_num, line)
-            continue
-
-        artist = parts[0].strip()
-        title = parts[1].strip()
-
-        if artist and title:
-            planned.append(PlannedTrack(title=title, artist=artist))
-            logger.debug("Parsed track %d: %s - %s", len(planned), artist, title)
-        else:
-            logger.warning("Line %d: Empty artist or title: %s", line_num, line)
-
-        if len(planned) >= MAX_TRACKS:
-            break
-
-    logger.info("Successfully parsed %d tracks from Claude response", len(planned))
 
+def _build_plan(planned: list[PlannedTrack]) -> PlaylistPlan:
+    """Validate the parsed tracks and wrap them into a plan."""
     if not planned:
         raise PlaylistPlannerError("Could not parse any tracks from Claude response")
 
@@ -153,13 +143,6 @@ def _parse_tracks(raw: str) -> PlaylistPlan:
     return PlaylistPlan(tracks=planned)
 
 
-def _resolve_model(model: str | None) -> str:
-    resolved = (model or load_settings().anthropic_model).strip()
-    if not resolved:
-        raise ClaudeConfigurationError("Anthropic model must be configured.")
-    return resolved
-
-
 class ClaudePlaylistPlanner:
     """High-level helper to request playlist ideas from Anthropic Claude."""
 
@@ -169,6 +152,8 @@ class ClaudePlaylistPlanner:
         *,
         api_key: str | None = None,
         model: str | None = None,
+        web_search: bool = True,
+        max_concurrency: int = DEFAULT_ANTHROPIC_MAX_CONCURRENCY,
     ) -> None:
         if client is None:
             self._client = get_client(api_key)
@@ -176,9 +161,23 @@ class ClaudePlaylistPlanner:
             if api_key is not None:
                 raise ClaudeConfigurationError("Provide either a client or an API key, not both.")
             self._client = client
-        self._model = _resolve_model(model)
+        self._model = resolve_model(model)
+        self._web_search = web_search
+        self._max_tokens = MAX_OUTPUT_TOKENS if web_search else MAX_OUTPUT_TOKENS_WITHOUT_SEARCH
+        self._limiter = get_request_limiter(max_concurrency)
 
-    async def plan(self, *, context: str, user_preferences: str | None = None) -> PlaylistPlan:
+    async def plan(
+        self,
+        *,
+        context: str,
+        user_preferences: str | None = None,
+        on_track: TrackCallback | None = None,
+    ) -> PlaylistPlan:
+        """Ask Claude for a playlist, streaming the response and parsing it as it arrives.
+
+        ``on_track`` is awaited for every track as soon as its line is complete, which
+        lets callers show progress before the whole plan is ready.
+        """
         if not context.strip():
             raise PlaylistPlannerError("Context prompt must not be empty")
 
@@ -187,7 +186,7 @@ class ClaudePlaylistPlanner:
             "Using model: %s, temperature: %s, max_tokens: %s",
             self._model,
             TEMPERATURE,
-            MAX_OUTPUT_TOKENS,
+            self._max_tokens,
         )
 
         # Build user preferences section
@@ -200,43 +199,78 @@ class ClaudePlaylistPlanner:
                 "No preference data available. Focus on the request itself.\n"
             )
 
+        user_content: list[TextBlockParam] = [
+            {"type": "text", "text": USER_PROMPT_INSTRUCTIONS, "cache_control": CACHE_CONTROL},
+            {
+                "type": "text",
+                "text": USER_PROMPT_TEMPLATE.format(
+                    context=context.strip(), user_preferences=prefs_section
+                ),
+            },
+        ]
+
+        # Tracks are parsed line by line while Claude is still generating, so the
+        # caller can react to each one and we can hang up as soon as we have enough.
+        # When web search is used, Claude may output reasoning in earlier text blocks
+        # and the actual song list after the tool results, so parsing restarts
+        # whenever a text block follows a non-text block.
+        # Only send the tool definition when web search is enabled
+        tool_options: dict[str, Any] = {"tools": [WEB_SEARCH_TOOL]} if self._web_search else {}
+        planned: list[PlannedTrack] = []
+        saw_text = False
         try:
-            user_content = USER_PROMPT_TEMPLATE.format(
-                context=context.strip(), user_preferences=prefs_section
-            )
-            response = await self._client.messages.create(
-                model=self._model,
-                max_tokens=MAX_OUTPUT_TOKENS,
-                temperature=TEMPERATURE,
-                system=SYSTEM_PROMPT,
-                messages=[{"role": "user", "content": user_content}],
-                tools=[WEB_SEARCH_TOOL],
-            )
-            logger.info("Received response from Claude API (stop_reason=%s)", response.stop_reason)
+            async with (
+                self._limiter,
+                self._client.messages.stream(
+                    model=self._model,
+                    max_tokens=self._max_tokens,
+                    temperature=TEMPERATURE,
+                    system=SYSTEM_BLOCKS,
+                    messages=[{"role": "user", "content": user_content}],
+                    **tool_options,
+                ) as stream,
+            ):
+                buffer = ""
+                previous_block_type: str | None = None
+                async for event in stream:
+                    if event.type == "content_block_start":
+                        block_type = event.content_block.type
+                        logger.debug("Processing response block: type=%s", block_type)
+                        if block_type == "text" and previous_block_type not in (None, "text"):
+                            buffer = ""
+                            planned.clear()
+                        previous_block_type = block_type
+                        continue
+                    if event.type != "text":
+                        continue
+
+                    saw_text = True
+                    buffer += event.text
+                    *lines, buffer = buffer.split("\n")
+                    for line in lines:
+                        await _collect_track(line, planned, on_track)
+                        if len(planned) >= MAX_TRACKS:
+                            break
+                    if len(planned) >= MAX_TRACKS:
+                        logger.info("Parsed %d tracks, closing Claude stream early", MAX_TRACKS)
+                        await stream.close()
+                        break
+                else:
+                    await _collect_track(buffer, planned, on_track)
+                    logger.info(
+                        "Received response from Claude API (stop_reason=%s)",
+                        stream.current_message_snapshot.stop_reason,
+                    )
         except Exception as exc:
             logger.error("Claude API request failed: %s", exc, exc_info=True)
             raise PlaylistPlannerError(f"Claude API request failed: {exc}") from exc
 
-        if not response.content:
-            logger.error("Claude returned empty content")
-            raise PlaylistPlannerError("Claude returned an empty response")
-
-        # Find the text block in the response (may have multiple blocks with web search)
-        # When web search is used, Claude may output reasoning/thinking in earlier blocks
-        # and the actual song list in later blocks, so we take the LAST text block
-        text: str = ""
-        for block in response.content:
-            logger.debug("Processing response block: type=%s", block.type)
-            if block.type == "text":
-                text = block.text  # Keep overwriting to get the last text block
-
-        if not text:
-            logger.error("No text block found in response, blocks: %s", response.content)
+        if not saw_text:
+            logger.error("No text block found in Claude response")
             raise PlaylistPlannerError("Claude response did not contain playlist text")
 
-        logger.debug("Extracted text from response, length: %d", len(text))
-
-        return _parse_tracks(text)
+        logger.info("Successfully parsed %d tracks from Claude response", len(planned))
+        return _build_plan(planned)
 
 
 __all__ = [
@@ -244,4 +278,5 @@ __all__ = [
     "PlannedTrack",
     "PlaylistPlan",
     "PlaylistPlannerError",
+    "TrackCallback",
 ]
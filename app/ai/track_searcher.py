@@ -5,16 +5,24 @@ from __future__ import annotations
 import logging
 
 from anthropic import AsyncAnthropic
+from anthropic.types import TextBlockParam
 
-from ..config import load_settings
-from .claude_client import ClaudeConfigurationError, get_client
-from .playlist_planner import PlannedTrack
+from ..config import DEFAULT_ANTHROPIC_MAX_CONCURRENCY
+from .claude_client import (
+    ClaudeConfigurationError,
+    get_client,
+    get_request_limiter,
+    resolve_model,
+)
+from .tracks import PlannedTrack, parse_track_line, strip_code_fence
 
 logger = logging.getLogger(__name__)
 
 MAX_TRACKS = 5
 MIN_TRACKS = 1
-MAX_OUTPUT_TOKENS = 512
+# Replies are at most MAX_TRACKS short "artist - song" lines; ~32 tokens a line leaves
+# room for non-Latin titles while stopping runaway generation early.
+MAX_OUTPUT_TOKENS = 32 * MAX_TRACKS
 TEMPERATURE = 0.7
 
 SYSTEM_PROMPT = """You are an expert music search engine with comprehensive knowledge of songs
@@ -40,9 +48,8 @@ Response Format:
 Always respond with ONLY a simple list in 'artist - song' format, one per line.
 No explanations, no numbering, no markdown."""
 
-USER_PROMPT_TEMPLATE = """Find songs matching this user description:
-
-"{description}"
+USER_PROMPT_INSTRUCTIONS = """Find songs matching the user description that follows these
+instructions.
 
 SEARCH STRATEGY:
 1. First, check if this contains LYRICS (words, syllables, phrases that appear in songs)
@@ -62,6 +69,12 @@ OUTPUT:
 IMPORTANT: For lyric searches, be thorough - many users search for songs they remember by
 specific words or sounds, especially from non-English songs or children's songs."""
 
+USER_PROMPT_TEMPLATE = '=== USER DESCRIPTION ===\n"{description}"'
+
+# The static prefix (system prompt + instructions) is only ~500 tokens, below the
+# 1024-token minimum Anthropic caches, so it is sent without cache_control markers.
+SYSTEM_BLOCKS: list[TextBlockParam] = [{"type": "text", "text": SYSTEM_PROMPT}]
+
 
 class TrackSearcherError(RuntimeError):
     """Raised when the track searcher fails to produce a valid result."""
@@ -69,44 +82,19 @@ class TrackSearcherError(RuntimeError):
 
 def _parse_tracks(raw: str) -> list[PlannedTrack]:
     """Parse simple 'artist - song' format from Claude response."""
-    logger.info("Parsing track search response: %s characters", len(raw))
-    logger.debug("Raw response: %s", raw[:500])
-
-    text = raw.strip()
-    # Remove markdown code blocks if present
-    if text.startswith("```") and text.endswith("```"):
-        logger.debug("Removing markdown code block wrapper")
-        lines = text.split("\n")
-        text = "\n".join(lines[1:-1])
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Raw response (%d characters): %s", len(raw), raw[:500])
 
     tracks: list[PlannedTrack] = []
-    for line_num, line in enumerate(text.split("\n"), start=1):
-        line = line.strip()
-        if not line:
+    for line in strip_code_fence(raw).splitlines():
+        track = parse_track_line(line)
+        if track is None:
             continue
-
-        # Remove numbering if present (e.g., "1. ", "1) ")
-        line = line.lstrip("0123456789.)-• ")
-
-        # Split by " - " to separate artist and song
-        parts = line.split(" - ", 1)
-        if len(parts) != 2:
-            logger.warning("Line %d: Invalid format (no ' - ' separator): %s", line_num, line)
-            continue
-
-        artist = parts[0].strip()
-        title = parts[1].strip()
-
-        if artist and title:
-            tracks.append(PlannedTrack(title=title, artist=artist))
-            logger.debug("Parsed track %d: %s - %s", len(tracks), artist, title)
-        else:
-            logger.warning("Line %d: Empty artist or title: %s", line_num, line)
-
+        tracks.append(track)
         if len(tracks) >= MAX_TRACKS:
             break
 
-    logger.info("Successfully parsed %d tracks from Claude response", len(tracks))
+    logger.info("Parsed %d tracks from a %d-character Claude response", len(tracks), len(raw))
 
     if not tracks:
         raise TrackSearcherError("Could not parse any tracks from Claude response")
@@ -118,13 +106,6 @@ def _parse_tracks(raw: str) -> list[PlannedTrack]:
     return tracks
 
 
-def _resolve_model(model: str | None) -> str:
-    resolved = (model or load_settings().anthropic_model).strip()
-    if not resolved:
-        raise ClaudeConfigurationError("Anthropic model must be configured.")
-    return resolved
-
-
 class ClaudeTrackSearcher:
     """High-level helper to search for tracks using Anthropic Claude."""
 
@@ -134,6 +115,7 @@ class ClaudeTrackSearcher:
         *,
         api_key: str | None = None,
         model: str | None = None,
+        max_concurrency: int = DEFAULT_ANTHROPIC_MAX_CONCURRENCY,
     ) -> None:
         if client is None:
             self._client = get_client(api_key)
@@ -141,31 +123,38 @@ class ClaudeTrackSearcher:
             if api_key is not None:
                 raise ClaudeConfigurationError("Provide either a client or an API key, not both.")
             self._client = client
-        self._model = _resolve_model(model)
+        self._model = resolve_model(model)
+        self._limiter = get_request_limiter(max_concurrency)
 
     async def search(self, *, description: str) -> list[PlannedTrack]:
         """Search for tracks matching the given description."""
         if not description.strip():
             raise TrackSearcherError("Description must not be empty")
 
-        logger.info("Searching for tracks with description: %s", description[:100])
-        logger.debug(
-            "Using model: %s, temperature: %s, max_tokens: %s",
-            self._model,
-            TEMPERATURE,
-            MAX_OUTPUT_TOKENS,
-        )
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "Searching for tracks with description %r (model=%s, max_tokens=%s)",
+                description[:100],
+                self._model,
+                MAX_OUTPUT_TOKENS,
+            )
 
         try:
-            user_content = USER_PROMPT_TEMPLATE.format(description=description.strip())
-            response = await self._client.messages.create(
-                model=self._model,
-                max_tokens=MAX_OUTPUT_TOKENS,
-                temperature=TEMPERATURE,
-                system=SYSTEM_PROMPT,
-                messages=[{"role": "user", "content": user_content}],
-            )
-            logger.info("Received response from Claude API")
+            user_content: list[TextBlockParam] = [
+                {"type": "text", "text": USER_PROMPT_INSTRUCTIONS},
+                {
+                    "type": "text",
+                    "text": USER_PROMPT_TEMPLATE.format(description=description.strip()),
+                },
+            ]
+            async with self._limiter:
+                response = await self._client.messages.create(
+                    model=self._model,
+                    max_tokens=MAX_OUTPUT_TOKENS,
+                    temperature=TEMPERATURE,
+                    system=SYSTEM_BLOCKS,
+                    messages=[{"role": "user", "content": user_content}],
+                )
         except Exception as exc:
             logger.error("Claude API request failed: %s", exc, exc_info=True)
             raise TrackSearcherError(f"Claude API request failed: {exc}") from exc
@@ -182,8 +171,6 @@ class ClaudeTrackSearcher:
         else:
             text = str(first_block)
 
-        logger.debug("Response text type: %s, length: %d", type(first_block).__name__, len(text))
-
         return _parse_tracks(text)
 
 
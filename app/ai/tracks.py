@@ -0,0 +1,48 @@
+"""Track suggestions shared by the Claude playlist planner and track searcher."""
+
+from __future__ import annotations
+
+import re
+import sys
+from dataclasses import dataclass
+
+# Leading list markers Claude sometimes adds despite instructions (e.g. "1. ", "2) ", "• ")
+_NUMBERING_PREFIX_RE = re.compile(r"^[0-9.)\-• ]+")
+
+
+@dataclass(slots=True, frozen=True)
+class PlannedTrack:
+    title: str
+    artist: str
+
+
+def parse_track_line(line: str) -> PlannedTrack | None:
+    """Parse a single 'artist - song' line, returning None when it is not a track."""
+    # Remove numbering if present (e.g., "1. ", "1) ")
+    line = _NUMBERING_PREFIX_RE.sub("", line.strip(), count=1)
+
+    # Split on the first " - " to separate artist and song; the line is already
+    # stripped, so only the inner edges need trimming.
+    artist, separator, title = line.partition(" - ")
+    if not separator:
+        return None
+
+    artist = artist.rstrip()
+    title = title.lstrip()
+    if not artist or not title:
+        return None
+    # Artists repeat across tracks and users, so share one string object per name
+    return PlannedTrack(title=title, artist=sys.intern(artist))
+
+
+def strip_code_fence(raw: str) -> str:
+    """Strip surrounding whitespace and a markdown code fence (with language tag) if present."""
+    text = raw.strip()
+    if text.startswith("```"):
+        newline = text.find("\n")
+        text = text[newline + 1 :] if newline != -1 else text.removeprefix("```")
+        text = text.removesuffix("```").rstrip()
+    return text
+
+
+__all__ = ["PlannedTrack", "parse_track_line", "strip_code_fence"]
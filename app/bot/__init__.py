@@ -6,4 +6,5 @@ __all__ = [
     "middleware",
     "playback",
     "playlists",
+    "search",
 ]
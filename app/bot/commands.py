@@ -2,20 +2,52 @@
 
 from __future__ import annotations
 
+import re
+import time
+from dataclasses import dataclass
+from pathlib import Path
 from typing import Any, cast
-from urllib.parse import urlencode
+from urllib.parse import quote_plus
 
 from aiogram import Router
 from aiogram.filters import Command, CommandStart
 from aiogram.types import Message
 
+from ..ai.playlist_planner import ClaudePlaylistPlanner
+from ..ai.track_searcher import ClaudeTrackSearcher
 from ..config import Settings
-from ..db import repository, schema
+from ..db import repository
 from ..spotify.client import RepositoryTokenStore, SpotifyClient, SpotifyClientError
 from .keyboards import build_playback_keyboard
 
 router = Router(name="commands")
 
+# /stats runs several aggregate queries; an admin re-polling it doesn't need fresher data.
+STATS_CACHE_TTL = 30.0
+
+
+@dataclass(slots=True)
+class _StatsSnapshot:
+    expires_at: float
+    bot_stats: repository.BotStats
+    recent_users: list[repository.UserStats]
+
+
+_stats_cache: dict[Path, _StatsSnapshot] = {}
+
+# Spotify error messages that call for a specific reply rather than a generic failure
+_EXPIRED_RE = re.compile(r"authorization has expired|reconnect", re.IGNORECASE)
+_DEVICE_RE = re.compile(r"restricted device|no controllable device available", re.IGNORECASE)
+
+
+def _classify_spotify_error(error_msg: str) -> str:
+    """Return ``"expired"``, ``"device"`` or ``"other"`` for a Spotify error message."""
+    if _EXPIRED_RE.search(error_msg):
+        return "expired"
+    if _DEVICE_RE.search(error_msg):
+        return "device"
+    return "other"
+
 
 def _bot_attr(message: Message, name: str) -> Any:
     value = getattr(message.bot, name, None)
@@ -36,20 +68,24 @@ def _get_spotify_client(message: Message) -> SpotifyClient:
     return cast(SpotifyClient, _bot_attr(message, "spotify_client"))
 
 
+def _get_track_searcher(message: Message) -> ClaudeTrackSearcher:
+    return cast(ClaudeTrackSearcher, _bot_attr(message, "track_searcher"))
+
+
+def _get_playlist_planner(message: Message) -> ClaudePlaylistPlanner:
+    return cast(ClaudePlaylistPlanner, _bot_attr(message, "playlist_planner"))
+
+
 def _build_login_url(settings: Settings, message: Message) -> str:
-    if message.from_user is None:
+    user = message.from_user
+    if user is None:
         raise RuntimeError("Unable to determine Telegram user")
-    params = {
-        "telegram_id": message.from_user.id,
-        "username": message.from_user.username or "",
-        "first_name": message.from_user.first_name or "",
-        "last_name": message.from_user.last_name or "",
-    }
-    query = urlencode(params)
-    return f"{settings.web_base_url}/spotify/login?{query}"
+    return _build_login_url_for_user(
+        settings, user.id, user.username or "", user.first_name or "", user.last_name or ""
+    )
 
 
-async def _ensure_user_record(settings: Settings, message: Message) -> None:
+async def _ensure_user_record(message: Message) -> None:
     if message.from_user is None:
         return
     profile = repository.UserProfile(
@@ -58,8 +94,8 @@ async def _ensure_user_record(settings: Settings, message: Message) -> None:
         first_name=message.from_user.first_name,
         last_name=message.from_user.last_name,
     )
-    async with repository.connect(settings.db_path) as connection:
-        await schema.apply_schema(connection)
+    # Pooled connections roll back anything left uncommitted when they are released
+    async with repository.connect(_get_settings(message).db_path) as connection:
         await repository.ensure_user(connection, profile)
         await connection.commit()
 
@@ -87,14 +123,12 @@ def _build_login_url_for_user(
     last_name: str = "",
 ) -> str:
     """Build login URL for a specific user without requiring a Message object."""
-    params = {
-        "telegram_id": telegram_id,
-        "username": username,
-        "first_name": first_name,
-        "last_name": last_name,
-    }
-    query = urlencode(params)
-    return f"{settings.web_base_url}/spotify/login?{query}"
+    return (
+        f"{settings.web_base_url}/spotify/login?telegram_id={telegram_id}"
+        f"&username={quote_plus(username)}"
+        f"&first_name={quote_plus(first_name)}"
+        f"&last_name={quote_plus(last_name)}"
+    )
 
 
 async def _send_link_prompt_for_user(
@@ -147,30 +181,40 @@ def _format_track(payload: dict[str, Any]) -> str:
     artists = ", ".join(
         artist.get("name", "?") for artist in item.get("artists", []) if isinstance(artist, dict)
     )
-    album = (item.get("album") or {}).get("name") if isinstance(item.get("album"), dict) else None
+    album_info = item.get("album")
+    album = album_info.get("name") if isinstance(album_info, dict) else None
     external_urls = item.get("external_urls")
-    external: dict[str, Any] = external_urls if isinstance(external_urls, dict) else {}
-    url = external.get("spotify")
-    device = payload.get("device") if isinstance(payload.get("device"), dict) else None
+    url = external_urls.get("spotify") if isinstance(external_urls, dict) else None
+    device = payload.get("device")
     device_name = device.get("name") if isinstance(device, dict) else None
 
-    bits = [f"🎧 <b>{name}</b>"]
-    if artists:
-        bits.append(f"by {artists}")
-    if album:
-        bits.append(f"on {album}")
-    if device_name:
-        bits.append(f"▶️ {device_name}")
-    text = "\n".join(bits)
-    if url:
-        text += f"\n<a href='{url}'>Open in Spotify</a>"
-    return text
+    return (
+        f"🎧 <b>{name}</b>"
+        + (f"\nby {artists}" if artists else "")
+        + (f"\non {album}" if album else "")
+        + (f"\n▶️ {device_name}" if device_name else "")
+        + (f"\n<a href='{url}'>Open in Spotify</a>" if url else "")
+    )
+
+
+async def _load_stats_snapshot(message: Message, settings: Settings) -> _StatsSnapshot:
+    now = time.monotonic()
+    snapshot = _stats_cache.get(settings.db_path)
+    if snapshot is not None and snapshot.expires_at > now:
+        return snapshot
+
+    async with repository.connect(settings.db_path) as connection:
+        bot_stats = await repository.get_bot_stats(connection)
+        recent_users = await repository.get_recent_users(connection, limit=10)
+    snapshot = _StatsSnapshot(now + STATS_CACHE_TTL, bot_stats, recent_users)
+    _stats_cache[settings.db_path] = snapshot
+    return snapshot
 
 
 @router.message(CommandStart())
 async def handle_start(message: Message) -> None:
     settings = _get_settings(message)
-    await _ensure_user_record(settings, message)
+    await _ensure_user_record(message)
     tokens = await _load_tokens(message)
 
     if tokens is None:
@@ -207,7 +251,7 @@ async def handle_now_playing(message: Message) -> None:
     except SpotifyClientError as exc:
         error_msg = str(exc)
         # Check if this is an expired/revoked token error
-        if "authorization has expired" in error_msg.lower() or "reconnect" in error_msg.lower():
+        if _classify_spotify_error(error_msg) == "expired":
             await _send_link_prompt(message, settings)
         else:
             await message.answer(f"Spotify request failed: {error_msg}")
@@ -270,12 +314,9 @@ async def handle_stats(message: Message) -> None:
         await message.answer("❌ Access denied. This command is for administrators only.")
         return
 
-    # Fetch statistics
-    async with repository.connect(settings.db_path) as connection:
-        await schema.apply_schema(connection)
-        bot_stats = await repository.get_bot_stats(connection)
-        recent_users = await repository.get_recent_users(connection, limit=10)
-        await connection.commit()
+    snapshot = await _load_stats_snapshot(message, settings)
+    bot_stats = snapshot.bot_stats
+    recent_users = snapshot.recent_users
 
     # Format overview
     text = (
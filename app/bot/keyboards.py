@@ -2,6 +2,8 @@
 
 from __future__ import annotations
 
+from functools import lru_cache
+
 from aiogram.filters.callback_data import CallbackData
 from aiogram.types import InlineKeyboardMarkup
 from aiogram.utils.keyboard import InlineKeyboardBuilder
@@ -16,6 +18,10 @@ class TransferConfirm(CallbackData, prefix="transfer"):
     confirm: str  # yes | no
 
 
+_PLAYBACK_ACTIONS = ("previous", "play", "pause", "next")
+_CB = {action: PlaybackAction(action=action).pack() for action in _PLAYBACK_ACTIONS}
+
+
 def build_auth_keyboard(login_url: str) -> InlineKeyboardMarkup:
     """Render a single button that links to the Spotify login flow."""
 
@@ -25,18 +31,24 @@ def build_auth_keyboard(login_url: str) -> InlineKeyboardMarkup:
     return builder.as_markup()
 
 
+@lru_cache(maxsize=1)
 def build_playback_keyboard() -> InlineKeyboardMarkup:
-    """Inline controls for playback operations (prev/play/pause/next)."""
+    """Inline controls for playback operations (prev/play/pause/next).
+
+    The markup never changes and is only serialized when sent, so one shared
+    instance is built and reused for every message.
+    """
 
     builder = InlineKeyboardBuilder()
-    builder.button(text="⏮", callback_data=PlaybackAction(action="previous").pack())
-    builder.button(text="▶️", callback_data=PlaybackAction(action="play").pack())
-    builder.button(text="⏸", callback_data=PlaybackAction(action="pause").pack())
-    builder.button(text="⏭", callback_data=PlaybackAction(action="next").pack())
+    builder.button(text="⏮", callback_data=_CB["previous"])
+    builder.button(text="▶️", callback_data=_CB["play"])
+    builder.button(text="⏸", callback_data=_CB["pause"])
+    builder.button(text="⏭", callback_data=_CB["next"])
     builder.adjust(4)
     return builder.as_markup()
 
 
+@lru_cache(maxsize=8)
 def build_transfer_confirm_keyboard(action: str) -> InlineKeyboardMarkup:
     """Ask the user to confirm transfer before executing action."""
 
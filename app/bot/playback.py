@@ -2,11 +2,16 @@
 
 from __future__ import annotations
 
+import asyncio
+from collections.abc import Callable, Coroutine
+from typing import Any, cast
+
 from aiogram import Router
 from aiogram.types import CallbackQuery, InaccessibleMessage
 
-from ..spotify.client import SpotifyClientError
+from ..spotify.client import SpotifyClient, SpotifyClientError
 from .commands import (
+    _classify_spotify_error,
     _format_track,
     _get_settings,
     _get_spotify_client,
@@ -30,12 +35,61 @@ _ACTION_TEXT = {
     "previous": "Rewound",
 }
 
+# Play state each toggle asks for, used to spot taps that change nothing
+_TARGET_IS_PLAYING = {"play": True, "pause": False}
+
+
+# Spotify calls still in flight, keyed by (Telegram user id, action). Repeated taps on the
+# same button join the pending call instead of firing another request.
+_inflight: dict[tuple[int, str], asyncio.Future[Any]] = {}
+
+
+async def _coalesce[T](key: tuple[int, str], start: Callable[[], Coroutine[Any, Any, T]]) -> T:
+    future = _inflight.get(key)
+    if future is None:
+        future = asyncio.ensure_future(start())
+        _inflight[key] = future
+        future.add_done_callback(lambda _: _inflight.pop(key, None))
+    # Shield so one tap's handler being cancelled doesn't cancel the shared call
+    return cast(T, await asyncio.shield(future))
+
+
+def _is_noop_toggle(
+    action: str, before: dict[str, Any] | None, after: dict[str, Any] | None
+) -> bool:
+    """Whether a play/pause tap left the same track in the state it was already in."""
+    target = _TARGET_IS_PLAYING.get(action)
+    if target is None or before is None or after is None:
+        return False
+    before_item = before.get("item") or {}
+    after_item = after.get("item") or {}
+    return (
+        before_item.get("id") == after_item.get("id")
+        and before.get("is_playing") is target
+        and after.get("is_playing") is target
+    )
+
+
+async def _perform_action(spotify: SpotifyClient, user_id: int, action: str) -> None:
+    if action == "play":
+        await spotify.play(user_id, allow_transfer=False)
+    elif action == "pause":
+        await spotify.pause(user_id, allow_transfer=False)
+    elif action == "next":
+        await spotify.next_track(user_id, allow_transfer=False)
+    elif action == "previous":
+        await spotify.previous_track(user_id, allow_transfer=False)
+
 
 @router.callback_query(PlaybackAction.filter())
 async def handle_playback_callback(callback: CallbackQuery, callback_data: PlaybackAction) -> None:
+    # Clear the button spinner while the Spotify round-trips run, not after them
+    await asyncio.gather(callback.answer(), _run_playback_action(callback, callback_data))
+
+
+async def _run_playback_action(callback: CallbackQuery, callback_data: PlaybackAction) -> None:
     message = callback.message
     user = callback.from_user
-    await callback.answer()
 
     if message is None or user is None or isinstance(message, InaccessibleMessage):
         return
@@ -57,46 +111,45 @@ async def handle_playback_callback(callback: CallbackQuery, callback_data: Playb
     spotify = _get_spotify_client(message)
     action = callback_data.action
 
+    if action not in _ACTION_TEXT:
+        # Unknown action, already answered callback
+        return
+
+    before = spotify.cached_playback(user.id)
     try:
-        if action == "play":
-            await spotify.play(user.id, allow_transfer=False)
-        elif action == "pause":
-            await spotify.pause(user.id, allow_transfer=False)
-        elif action == "next":
-            await spotify.next_track(user.id, allow_transfer=False)
-        elif action == "previous":
-            await spotify.previous_track(user.id, allow_transfer=False)
-        else:
-            # Unknown action, already answered callback
-            return
+        await _coalesce((user.id, action), lambda: _perform_action(spotify, user.id, action))
     except SpotifyClientError as exc:
         error_msg = str(exc)
-        # Check if this is an expired/revoked token error
-        if "authorization has expired" in error_msg.lower() or "reconnect" in error_msg.lower():
-            await _send_link_prompt_for_user(
-                message,
-                settings,
-                user.id,
-                user.username or "",
-                user.first_name or "",
-                user.last_name or "",
-            )
-        elif "Restricted device" in error_msg or "No controllable device available" in error_msg:
-            await message.answer(
-                "This device can't be controlled. Transfer playback to a controllable "
-                "device (phone/computer) to continue?",
-                reply_markup=build_transfer_confirm_keyboard(action),
-            )
-        else:
-            await message.answer(f"❌ Spotify error: {error_msg}")
+        match _classify_spotify_error(error_msg):
+            case "expired":
+                await _send_link_prompt_for_user(
+                    message,
+                    settings,
+                    user.id,
+                    user.username or "",
+                    user.first_name or "",
+                    user.last_name or "",
+                )
+            case "device":
+                await message.answer(
+                    "This device can't be controlled. Transfer playback to a controllable "
+                    "device (phone/computer) to continue?",
+                    reply_markup=build_transfer_confirm_keyboard(action),
+                )
+            case _:
+                await message.answer(f"❌ Spotify error: {error_msg}")
+        return
+
+    if _is_noop_toggle(action, before, spotify.cached_playback(user.id)):
+        # Nothing changed, so a fresh now-playing message would only repeat the last one
         return
 
     playback = None
     try:
-        playback = await spotify.get_currently_playing(user.id)
+        playback = await _coalesce((user.id, "now"), lambda: spotify.get_currently_playing(user.id))
     except SpotifyClientError as exc:
         error_msg = str(exc)
-        if "authorization has expired" in error_msg.lower() or "reconnect" in error_msg.lower():
+        if _classify_spotify_error(error_msg) == "expired":
             await _send_link_prompt_for_user(
                 message,
                 settings,
@@ -123,9 +176,12 @@ async def handle_playback_callback(callback: CallbackQuery, callback_data: Playb
 
 @router.callback_query(TransferConfirm.filter())
 async def handle_transfer_confirm(callback: CallbackQuery, callback_data: TransferConfirm) -> None:
+    await asyncio.gather(callback.answer(), _run_transfer_confirm(callback, callback_data))
+
+
+async def _run_transfer_confirm(callback: CallbackQuery, callback_data: TransferConfirm) -> None:
     message = callback.message
     user = callback.from_user
-    await callback.answer()
 
     if message is None or user is None or isinstance(message, InaccessibleMessage):
         return
@@ -151,7 +207,7 @@ async def handle_transfer_confirm(callback: CallbackQuery, callback_data: Transf
             return
     except SpotifyClientError as exc:
         error_msg = str(exc)
-        if "authorization has expired" in error_msg.lower() or "reconnect" in error_msg.lower():
+        if _classify_spotify_error(error_msg) == "expired":
             await _send_link_prompt_for_user(
                 message,
                 _get_settings(message),
@@ -170,7 +226,7 @@ async def handle_transfer_confirm(callback: CallbackQuery, callback_data: Transf
         playback = await spotify.get_currently_playing(user.id)
     except SpotifyClientError as exc:
         error_msg = str(exc)
-        if "authorization has expired" in error_msg.lower() or "reconnect" in error_msg.lower():
+        if _classify_spotify_error(error_msg) == "expired":
             await _send_link_prompt_for_user(
                 message,
                 settings,
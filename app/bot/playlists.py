@@ -3,30 +3,58 @@
 from __future__ import annotations
 
 import asyncio
+import hashlib
+import json
 import logging
+import time
+from collections.abc import Callable
 from dataclasses import dataclass
-from datetime import UTC, datetime
+from datetime import UTC, datetime, timedelta
 from typing import Any
 
 from aiogram import F, Router
 from aiogram.filters import Command
 from aiogram.types import Message
-from anthropic import AsyncAnthropic
 
+from ..ai.claude_client import get_client
 from ..ai.playlist_planner import (
-    ClaudePlaylistPlanner,
     PlannedTrack,
+    PlaylistPlan,
     PlaylistPlannerError,
 )
-from ..db import repository, schema
+from ..config import Settings
+from ..db import repository
 from ..spotify.client import SpotifyClient, SpotifyClientError
-from .commands import _get_settings, _get_spotify_client, _load_tokens, _send_link_prompt
+from .commands import (
+    _get_playlist_planner,
+    _get_settings,
+    _get_spotify_client,
+    _load_tokens,
+    _send_link_prompt,
+)
 from .keyboards import build_playback_keyboard
 
 logger = logging.getLogger(__name__)
 
 router = Router(name="playlists")
 
+# Searches share one HTTP/2 connection; 429s are absorbed by SpotifyClient's backoff.
+MAX_CONCURRENT_SEARCHES = 15
+# Telegram rate-limits message edits, so progress is reported at most once a second.
+PROGRESS_EDIT_INTERVAL = 1.0
+# Listening history drifts slowly; reusing it for a while saves four Spotify calls per /mix.
+PREFERENCES_CACHE_TTL = 1800.0
+PREFERENCES_CACHE_MAX_SIZE = 10_000
+# Identical context + taste yields an equally good plan, so skip Claude for a day.
+PLAN_CACHE_TTL = timedelta(hours=24)
+# Popular tracks recur across users; caching only the matched URI keeps entries small.
+TRACK_URI_CACHE_MAX_SIZE = 50_000
+
+_preferences_cache: dict[int, tuple[float, str]] = {}
+_track_uri_cache: dict[tuple[str, str], str] = {}
+# Strong references to fire-and-forget tasks so they aren't garbage-collected mid-run
+_background_tasks: set[asyncio.Task[None]] = set()
+
 
 @dataclass
 class UserPreferencesResult:
@@ -45,6 +73,28 @@ def _is_scope_error(exc: BaseException) -> bool:
 
 
 async def _fetch_user_preferences(spotify: SpotifyClient, user_id: int) -> UserPreferencesResult:
+    """Return the user's formatted preferences, reusing a recent result when available."""
+    cached = _preferences_cache.get(user_id)
+    if cached is not None:
+        expires_at, preferences = cached
+        if expires_at > time.monotonic():
+            logger.info("Using cached preferences for user %s", user_id)
+            return UserPreferencesResult(preferences=preferences)
+        del _preferences_cache[user_id]
+
+    result = await _load_user_preferences(spotify, user_id)
+    # Only real data is cached: empty or re-auth results are retried on the next /mix.
+    if result.preferences and not result.needs_reauth:
+        if len(_preferences_cache) >= PREFERENCES_CACHE_MAX_SIZE:
+            del _preferences_cache[next(iter(_preferences_cache))]
+        _preferences_cache[user_id] = (
+            time.monotonic() + PREFERENCES_CACHE_TTL,
+            result.preferences,
+        )
+    return result
+
+
+async def _load_user_preferences(spotify: SpotifyClient, user_id: int) -> UserPreferencesResult:
     """Fetch and format user's Spotify preferences for the AI prompt."""
     logger.info("Fetching user preferences for user %s", user_id)
 
@@ -165,7 +215,7 @@ async def _playlist_name(context: str, api_key: str | None, model: str) -> str:
         return base
 
     try:
-        client = AsyncAnthropic(api_key=api_key)
+        client = get_client(api_key)
         prompt = (
             f"Generate a short, catchy playlist name (max 30 characters) "
             f"based on this context: {context.strip()}\n\n"
@@ -206,58 +256,43 @@ def _playlist_description(context: str) -> str:
 
 
 def _find_best_uri(options: list[dict[str, Any]], track: PlannedTrack) -> str | None:
-    """Find the best matching Spotify URI from search results."""
+    """Find the best matching Spotify URI from search results.
+
+    Candidates are ranked in one pass: title contained in the name with an artist match,
+    then at least two shared title words with an artist match, then the first candidate
+    with a URI. The earliest candidate wins within a tier.
+    """
     if not options:
         return None
 
     target_title = track.title.lower()
     target_artist = track.artist.lower()
+    title_words = set(target_title.split())
 
-    # First pass: exact title match with artist match
+    best_uri: str | None = None
+    best_score = 0
     for candidate in options:
         if not isinstance(candidate, dict):
             continue  # type: ignore[unreachable]
         uri = candidate.get("uri")
-        name = str(candidate.get("name", "")).lower()
-        artists = [
-            str(artist.get("name", "")).lower()
-            for artist in candidate.get("artists", [])
-            if isinstance(artist, dict)
-        ]
-        if (
-            isinstance(uri, str)
-            and target_title in name
-            and any(target_artist in artist for artist in artists)
-        ):
-            return uri
+        if not isinstance(uri, str):
+            continue
 
-    # Second pass: partial title match with artist match
-    for candidate in options:
-        if not isinstance(candidate, dict):
-            continue  # type: ignore[unreachable]
-        uri = candidate.get("uri")
         name = str(candidate.get("name", "")).lower()
-        artists = [
-            str(artist.get("name", "")).lower()
+        score = 1
+        if any(
+            target_artist in str(artist.get("name", "")).lower()
             for artist in candidate.get("artists", [])
             if isinstance(artist, dict)
-        ]
-        # Check if key words from title are in the track name
-        title_words = set(target_title.split())
-        name_words = set(name.split())
-        if (
-            isinstance(uri, str)
-            and len(title_words & name_words) >= 2
-            and any(target_artist in artist for artist in artists)
         ):
-            return uri
+            if target_title in name:
+                return uri
+            if len(title_words & set(name.split())) >= 2:
+                score = 2
 
-    # Third pass: just return the first result if available
-    for candidate in options:
-        uri = candidate.get("uri") if isinstance(candidate, dict) else None
-        if isinstance(uri, str):
-            return uri
-    return None
+        if score > best_score:
+            best_uri, best_score = uri, score
+    return best_uri
 
 
 def _summarize_tracks(tracks: list[PlannedTrack], limit: int = 10) -> str:
@@ -269,29 +304,135 @@ def _summarize_tracks(tracks: list[PlannedTrack], limit: int = 10) -> str:
     return "\n".join(lines)
 
 
-async def _search_track_with_retry(
-    spotify: SpotifyClient,
-    user_id: int,
-    planned: PlannedTrack,
-    semaphore: asyncio.Semaphore,
-) -> tuple[PlannedTrack, str | None]:
-    """Search for a single track with rate limiting."""
-    query = f"{planned.artist} {planned.title}"
-    async with semaphore:
-        try:
-            logger.debug("Searching: %s", query)
-            results = await spotify.search_track(user_id, query=query, limit=5)
-            uri = _find_best_uri(results, planned) if results else None
-            if uri is None:
-                logger.warning(
-                    "Could not find Spotify URI for: %s - %s", planned.artist, planned.title
-                )
-            else:
-                logger.debug("Found URI for track: %s", uri)
-            return (planned, uri)
-        except SpotifyClientError as exc:
-            logger.error("Spotify search failed for query '%s': %s", query, exc)
-            raise
+def _plan_cache_key(context: str, user_preferences: str) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(context.strip().casefold().encode())
+    digest.update(b"\0")
+    digest.update(user_preferences.encode())
+    return digest.hexdigest()
+
+
+async def _load_cached_plan(message: Message, plan_key: str, now: datetime) -> PlaylistPlan | None:
+    """Return a recent plan for the same context and preferences, if one is stored."""
+    try:
+        async with repository.connect(_get_settings(message).db_path) as connection:
+            payload = await repository.get_playlist_plan(
+                connection, plan_key, not_before=now - PLAN_CACHE_TTL
+            )
+        if payload is None:
+            return None
+        tracks = [PlannedTrack(title=title, artist=artist) for artist, title in json.loads(payload)]
+    except Exception as exc:
+        logger.warning("Could not read cached playlist plan: %s", exc)
+        return None
+    return PlaylistPlan(tracks=tracks) if tracks else None
+
+
+async def _store_plan(message: Message, plan_key: str, plan: PlaylistPlan, now: datetime) -> None:
+    """Persist a freshly generated plan so a repeat request can skip Claude."""
+    payload = json.dumps([(track.artist, track.title) for track in plan.tracks])
+    try:
+        async with (
+            repository.connect(_get_settings(message).db_path) as connection,
+            repository.transaction(connection),
+        ):
+            await repository.store_playlist_plan(
+                connection,
+                plan_key=plan_key,
+                plan_json=payload,
+                now=now,
+                prune_before=now - PLAN_CACHE_TTL,
+            )
+    except Exception as exc:
+        logger.warning("Could not cache playlist plan: %s", exc)
+
+
+async def _report_progress(
+    status_message: Message, completed: Callable[[], int], total: int
+) -> None:
+    """Edit the status message with search progress, at most once per interval."""
+    reported = -1
+    while True:
+        done = completed()
+        if done != reported:
+            try:
+                await status_message.edit_text(f"Cooking up a playlist? ({done}/{total} tracks)")
+            except Exception as exc:
+                logger.debug("Could not update progress message: %s", exc)
+            reported = done
+        await asyncio.sleep(PROGRESS_EDIT_INTERVAL)
+
+
+class _TrackSearches:
+    """Spotify searches for planned tracks, startable while Claude is still streaming."""
+
+    def __init__(
+        self,
+        spotify: SpotifyClient,
+        user_id: int,
+        *,
+        max_concurrent: int = MAX_CONCURRENT_SEARCHES,
+    ) -> None:
+        self._spotify = spotify
+        self._user_id = user_id
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._tasks: dict[tuple[str, str], asyncio.Task[str | None]] = {}
+
+    async def on_track(self, track: PlannedTrack) -> None:
+        """Planner callback: kick off the search for a track as soon as it is parsed."""
+        self._start(track)
+
+    async def results(
+        self, tracks: list[PlannedTrack], on_result: Callable[[], None] | None = None
+    ) -> list[str | None]:
+        """Return the matched Spotify URI for ``tracks`` in order, reusing searches already started.
+
+        ``on_result`` is called once per entry of ``tracks`` as its match becomes available,
+        so progress matches the final plan even when tracks share a search.
+        """
+
+        async def _result(track: PlannedTrack) -> str | None:
+            uri = await self._start(track)
+            if on_result is not None:
+                on_result()
+            return uri
+
+        return list(await asyncio.gather(*(_result(track) for track in tracks)))
+
+    def cancel(self) -> None:
+        """Cancel searches still running, e.g. for tracks the planner later discarded."""
+        for task in self._tasks.values():
+            if not task.done():
+                task.cancel()
+            elif not task.cancelled():
+                # Mark failures as retrieved so asyncio doesn't log them at collection
+                task.exception()
+
+    def _start(self, track: PlannedTrack) -> asyncio.Task[str | None]:
+        # Case-insensitive key so near-duplicates Claude emits share one Spotify request
+        key = (track.artist.strip().lower(), track.title.strip().lower())
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.create_task(self._resolve(key, track))
+            self._tasks[key] = task
+        return task
+
+    async def _resolve(self, key: tuple[str, str], track: PlannedTrack) -> str | None:
+        uri = _track_uri_cache.pop(key, None)
+        if uri is not None:
+            _track_uri_cache[key] = uri  # re-insert as most recently used
+            return uri
+
+        async with self._semaphore:
+            options = await self._spotify.search_track(
+                self._user_id, query=f"{track.artist} {track.title}", limit=5
+            )
+        uri = _find_best_uri(options, track)
+        if uri is not None:
+            if len(_track_uri_cache) >= TRACK_URI_CACHE_MAX_SIZE:
+                del _track_uri_cache[next(iter(_track_uri_cache))]
+            _track_uri_cache[key] = uri
+        return uri
 
 
 async def _search_tracks_parallel(
@@ -299,65 +440,48 @@ async def _search_tracks_parallel(
     user_id: int,
     tracks: list[PlannedTrack],
     *,
-    max_concurrent: int = 5,
-    batch_size: int = 10,
+    max_concurrent: int = MAX_CONCURRENT_SEARCHES,
     status_message: Message | None = None,
+    searches: _TrackSearches | None = None,
 ) -> tuple[list[tuple[PlannedTrack, str]], list[PlannedTrack]]:
-    """Search for tracks in parallel with rate limiting and batching."""
+    """Search for all tracks at once, with concurrency capped by a single semaphore.
+
+    Pass ``searches`` to reuse searches that were started while the plan was streaming.
+    """
     found_tracks: list[tuple[PlannedTrack, str]] = []
     missing_tracks: list[PlannedTrack] = []
 
-    # Process in batches to avoid overwhelming the API
-    semaphore = asyncio.Semaphore(max_concurrent)
-
-    for batch_idx in range(0, len(tracks), batch_size):
-        batch = tracks[batch_idx : batch_idx + batch_size]
-        batch_end = min(batch_idx + batch_size, len(tracks))
-        logger.info(
-            "Processing batch %d-%d of %d tracks",
-            batch_idx + 1,
-            batch_end,
-            len(tracks),
-        )
-
-        # Update progress message
-        if status_message is not None:
-            try:
-                await status_message.edit_text(
-                    f"Cooking up a playlist? ({batch_end}/{len(tracks)} tracks)"
-                )
-            except Exception as exc:
-                logger.debug("Could not update progress message: %s", exc)
+    logger.info("Searching Spotify for %d tracks", len(tracks))
+    if searches is None:
+        searches = _TrackSearches(spotify, user_id, max_concurrent=max_concurrent)
+    completed = 0
 
-        # Create tasks for this batch
-        tasks = [
-            _search_track_with_retry(spotify, user_id, planned, semaphore) for planned in batch
-        ]
+    def _count_result() -> None:
+        nonlocal completed
+        completed += 1
 
-        # Wait for all tasks in this batch to complete
-        try:
-            results = await asyncio.gather(*tasks, return_exceptions=True)
-        except Exception as exc:
-            logger.error("Batch search failed: %s", exc)
-            raise SpotifyClientError(f"Search batch failed: {exc}") from exc
-
-        # Process results
-        for result in results:
-            if isinstance(result, Exception):
-                # If any search in the batch failed, propagate the error
-                raise result
-            if isinstance(result, tuple):
-                planned, uri = result
-            else:
-                continue
-            if uri is None:
-                missing_tracks.append(planned)
-            else:
-                found_tracks.append((planned, uri))
+    progress_task = (
+        asyncio.create_task(_report_progress(status_message, lambda: completed, len(tracks)))
+        if status_message is not None
+        else None
+    )
 
-        # Small delay between batches to be nice to the API
-        if batch_idx + batch_size < len(tracks):
-            await asyncio.sleep(0.5)
+    try:
+        results = await searches.results(tracks, on_result=_count_result)
+    except SpotifyClientError as exc:
+        logger.error("Spotify search failed: %s", exc)
+        raise
+    finally:
+        if progress_task is not None:
+            progress_task.cancel()
+        searches.cancel()
+
+    for planned, uri in zip(tracks, results, strict=True):
+        if uri is None:
+            logger.warning("Could not find Spotify URI for: %s - %s", planned.artist, planned.title)
+            missing_tracks.append(planned)
+        else:
+            found_tracks.append((planned, uri))
 
     return found_tracks, missing_tracks
 
@@ -396,50 +520,33 @@ async def _create_mix(message: Message, context: str) -> None:
     status = None
 
     try:
-        async with repository.connect(settings.db_path) as connection:
-            await schema.apply_schema(connection)
-            await connection.commit()
-            await connection.execute("BEGIN IMMEDIATE")
+        async with (
+            repository.connect(settings.db_path) as connection,
+            repository.transaction(connection),
+        ):
             profile = repository.UserProfile(
                 telegram_id=message.from_user.id,
                 username=message.from_user.username,
                 first_name=message.from_user.first_name,
                 last_name=message.from_user.last_name,
             )
-            try:
-                internal_user_id = await repository.ensure_user(connection, profile)
-                rate_limit = await repository.check_mix_rate_limit(
-                    connection,
-                    user_id=internal_user_id,
-                    now=now,
-                )
-                if not rate_limit.allowed:
-                    await connection.rollback()
-                    await message.answer(rate_limit.reason or "Too many mixes right now, bro.")
-                    return
-                await repository.increment_mix_request(
-                    connection,
-                    user_id=internal_user_id,
-                    request_date=rate_limit.request_date,
-                    now=now,
-                )
-                await repository.mark_mix_processing(
-                    connection,
-                    user_id=internal_user_id,
-                    request_date=rate_limit.request_date,
-                    now=now,
-                )
-                await connection.commit()
-                rate_limit_request_date = rate_limit.request_date
-                processing_marked = True
-            except Exception:
-                await connection.rollback()
-                raise
+            internal_user_id = await repository.ensure_user(connection, profile)
+            rate_limit = await repository.try_admit_mix(
+                connection,
+                user_id=internal_user_id,
+                now=now,
+            )
     except Exception:
         logger.exception("Rate limiting failed for user %s", user_id)
         await message.answer("Couldn't start the mix right now. Try again in a bit.")
         return
 
+    if not rate_limit.allowed:
+        await message.answer(rate_limit.reason or "Too many mixes right now, bro.")
+        return
+    rate_limit_request_date = rate_limit.request_date
+    processing_marked = True
+
     try:
         status = await message.answer("Cooking up a playlist?")
 
@@ -479,17 +586,29 @@ async def _create_mix(message: Message, context: str) -> None:
         except Exception as status_exc:
             logger.debug("Could not update status message: %s", status_exc)
 
-        planner = ClaudePlaylistPlanner(
-            api_key=settings.anthropic_api_key,
-            model=settings.anthropic_model,
-        )
-        try:
-            plan = await planner.plan(context=context, user_preferences=user_preferences)
-            logger.info("Successfully generated playlist plan with %d tracks", len(plan.tracks))
-        except PlaylistPlannerError as exc:
-            logger.error("Playlist planning failed for user %s: %s", user_id, exc, exc_info=True)
-            await status.edit_text(f"Claude couldn't build a playlist: {exc!s}")
-            return
+        planner = _get_playlist_planner(message)
+        # Each track's Spotify search starts as soon as Claude streams its line
+        searches = _TrackSearches(spotify, user_id)
+        plan_key = _plan_cache_key(context, user_preferences)
+        plan = await _load_cached_plan(message, plan_key, now)
+        if plan is not None:
+            logger.info("Reusing cached playlist plan with %d tracks", len(plan.tracks))
+        else:
+            try:
+                plan = await planner.plan(
+                    context=context,
+                    user_preferences=user_preferences,
+                    on_track=searches.on_track,
+                )
+                logger.info("Successfully generated playlist plan with %d tracks", len(plan.tracks))
+            except PlaylistPlannerError as exc:
+                searches.cancel()
+                logger.error(
+                    "Playlist planning failed for user %s: %s", user_id, exc, exc_info=True
+                )
+                await status.edit_text(f"Claude couldn't build a playlist: {exc!s}")
+                return
+            await _store_plan(message, plan_key, plan, now)
 
         logger.info("Starting parallel Spotify search for %d tracks", len(plan.tracks))
         try:
@@ -497,9 +616,8 @@ async def _create_mix(message: Message, context: str) -> None:
                 spotify,
                 user_id,
                 plan.tracks,
-                max_concurrent=5,
-                batch_size=10,
                 status_message=status,
+                searches=searches,
             )
         except SpotifyClientError as exc:
             logger.error("Parallel search failed: %s", exc)
@@ -553,7 +671,8 @@ async def _create_mix(message: Message, context: str) -> None:
             await spotify.add_tracks(
                 user_id,
                 playlist_id=playlist_id,
-                track_uris=[uri for _, uri in found_tracks],
+                # Distinct planned tracks can resolve to the same recording
+                track_uris=list(dict.fromkeys(uri for _, uri in found_tracks)),
             )
             logger.info("Successfully added tracks to playlist")
         except SpotifyClientError as exc:
@@ -595,16 +714,25 @@ async def _create_mix(message: Message, context: str) -> None:
             and internal_user_id is not None
             and rate_limit_request_date is not None
         ):
-            try:
-                async with repository.connect(settings.db_path) as connection:
-                    await repository.clear_mix_processing(
-                        connection,
-                        user_id=internal_user_id,
-                        request_date=rate_limit_request_date,
-                    )
-                    await connection.commit()
-            except Exception:
-                logger.exception("Failed to clear mix processing lock for user %s", user_id)
+            # The reply is already out; don't hold the handler for another disk sync
+            task = asyncio.create_task(
+                _finalize_mix(settings, internal_user_id, rate_limit_request_date)
+            )
+            _background_tasks.add(task)
+            task.add_done_callback(_background_tasks.discard)
+
+
+async def _finalize_mix(settings: Settings, user_id: int, request_date: str) -> None:
+    try:
+        async with repository.connect(settings.db_path) as connection:
+            await repository.finalize_mix(
+                connection,
+                user_id=user_id,
+                request_date=request_date,
+            )
+            await connection.commit()
+    except Exception:
+        logger.exception("Failed to finalize mix for user %s", user_id)
 
 
 @router.message(Command("mix"))
@@ -2,74 +2,99 @@
 
 from __future__ import annotations
 
+import asyncio
 import logging
+import time
 from typing import Any
 
 from aiogram import Router
 from aiogram.filters import Command
 from aiogram.types import Message
 
+from ..ai.local_index import TrackIndex
 from ..ai.playlist_planner import PlannedTrack
-from ..ai.track_searcher import ClaudeTrackSearcher, TrackSearcherError
-from ..spotify.client import SpotifyClientError
-from .commands import _get_settings, _get_spotify_client, _load_tokens, _send_link_prompt
+from ..ai.track_searcher import TrackSearcherError
+from ..spotify.client import SpotifyClient, SpotifyClientError
+from .commands import (
+    _get_settings,
+    _get_spotify_client,
+    _get_track_searcher,
+    _load_tokens,
+    _send_link_prompt,
+)
 
 router = Router(name="search")
 
 logger = logging.getLogger(__name__)
 
+# A handful of suggestions per /search; cap in-flight requests to stay clear of 429s.
+MAX_CONCURRENT_SEARCHES = 5
+# Search listings aren't user-specific, so overlapping suggestions across users share them.
+SEARCH_CACHE_TTL = 3600.0
+SEARCH_CACHE_MAX_SIZE = 4096
+
+_search_cache: dict[tuple[str, int], tuple[float, list[dict[str, Any]]]] = {}
+_recent_tracks = TrackIndex()
+
+
+async def _cached_search(
+    spotify: SpotifyClient, user_id: int, query: str, *, limit: int
+) -> list[dict[str, Any]]:
+    """Search Spotify, reusing a recent result for the same normalised query."""
+    key = (" ".join(query.lower().split()), limit)
+    cached = _search_cache.get(key)
+    if cached is not None:
+        expires_at, results = cached
+        if expires_at > time.monotonic():
+            return results
+        del _search_cache[key]
+
+    results = await spotify.search_track(user_id, query=query, limit=limit)
+    if len(_search_cache) >= SEARCH_CACHE_MAX_SIZE:
+        del _search_cache[next(iter(_search_cache))]
+    _search_cache[key] = (time.monotonic() + SEARCH_CACHE_TTL, results)
+    return results
+
 
 def _select_best_track(
     options: list[dict[str, Any]], planned: PlannedTrack
 ) -> dict[str, Any] | None:
-    """Pick the best Spotify track candidate for the planned track."""
+    """Pick the best Spotify track candidate for the planned track.
+
+    One pass ranks candidates: title contained in the name with an artist match, then at
+    least two shared title words with an artist match, then the first candidate with a URI.
+    The earliest candidate wins within a tier.
+    """
 
     if not options:
         return None
 
     target_title = planned.title.lower()
     target_artist = planned.artist.lower()
+    title_words = frozenset(target_title.split())
 
-    # Pass 1: exact title match with artist match
+    partial: dict[str, Any] | None = None
+    fallback: dict[str, Any] | None = None
     for candidate in options:
-        uri = candidate.get("uri")
-        name = str(candidate.get("name", "")).lower()
-        artists = [
-            str(artist.get("name", "")).lower()
-            for artist in candidate.get("artists", [])
-            if isinstance(artist, dict)
-        ]
-        if (
-            isinstance(uri, str)
-            and target_title in name
-            and any(target_artist in artist for artist in artists)
-        ):
-            return candidate
+        if not isinstance(candidate.get("uri"), str):
+            continue
+        if fallback is None:
+            fallback = candidate
 
-    # Pass 2: partial title match with artist match
-    for candidate in options:
-        uri = candidate.get("uri")
-        name = str(candidate.get("name", "")).lower()
-        artists = [
-            str(artist.get("name", "")).lower()
+        artist_match = any(
+            target_artist in str(artist.get("name", "")).lower()
             for artist in candidate.get("artists", [])
             if isinstance(artist, dict)
-        ]
-        title_words = set(target_title.split())
-        name_words = set(name.split())
-        if (
-            isinstance(uri, str)
-            and len(title_words & name_words) >= 2
-            and any(target_artist in artist for artist in artists)
-        ):
-            return candidate
-
-    # Fall back to first option with a URI
-    for candidate in options:
-        if isinstance(candidate.get("uri"), str):
+        )
+        if not artist_match:
+            continue
+        name = str(candidate.get("name", "")).lower()
+        if target_title in name:
             return candidate
+        if partial is None and len(title_words & set(name.split())) >= 2:
+            partial = candidate
 
-    return None
+    return partial or fallback
 
 
 def _format_track_message(track: dict[str, Any], *, prefix: str | None = None) -> str:
@@ -77,19 +102,16 @@ def _format_track_message(track: dict[str, Any], *, prefix: str | None = None) -
     artists = ", ".join(
         artist.get("name", "?") for artist in track.get("artists", []) if isinstance(artist, dict)
     )
-    album = track.get("album", {}).get("name") if isinstance(track.get("album"), dict) else None
+    album = track.get("album")
+    album_name = album.get("name") if isinstance(album, dict) else None
     external_urls = track.get("external_urls")
     url = external_urls.get("spotify") if isinstance(external_urls, dict) else None
 
-    lines: list[str] = []
-    if prefix:
-        lines.append(prefix)
-    lines.append(f"🎶 <b>{name}</b>")
+    text = f"{prefix}\n🎶 <b>{name}</b>" if prefix else f"🎶 <b>{name}</b>"
     if artists:
-        lines.append(f"by {artists}")
-    if album:
-        lines.append(f"on {album}")
-    text = "\n".join(lines)
+        text += f"\nby {artists}"
+    if album_name:
+        text += f"\non {album_name}"
     if url:
         text += f"\n<a href='{url}'>Open in Spotify</a>"
     return text
@@ -137,32 +159,43 @@ async def handle_search_command(message: Message) -> None:
 
     status_message = await message.answer("🎧 Listening to your description...")
 
-    searcher = ClaudeTrackSearcher(
-        api_key=settings.anthropic_api_key,
-        model=settings.anthropic_model,
-    )
-
-    try:
-        suggestions = await searcher.search(description=description)
-    except TrackSearcherError as exc:
-        logger.error("Track search failed for user %s: %s", user_id, exc)
-        await status_message.edit_text(f"Couldn't interpret your description: {exc!s}")
-        return
+    known = _recent_tracks.match(description)
+    if known is not None:
+        # The description names a track we've matched before; no need to ask Claude
+        logger.info("Resolved /search locally to %s - %s", known.artist, known.title)
+        suggestions = [known]
+    else:
+        searcher = _get_track_searcher(message)
+        try:
+            suggestions = await searcher.search(description=description)
+        except TrackSearcherError as exc:
+            logger.error("Track search failed for user %s: %s", user_id, exc)
+            await status_message.edit_text(f"Couldn't interpret your description: {exc!s}")
+            return
 
     spotify = _get_spotify_client(message)
 
     found_tracks: list[tuple[PlannedTrack, dict[str, Any]]] = []
     missing_tracks: list[PlannedTrack] = []
 
-    for planned in suggestions:
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_SEARCHES)
+
+    async def _search(planned: PlannedTrack) -> list[dict[str, Any]]:
         query = f"{planned.artist} {planned.title}"
-        try:
-            search_results = await spotify.search_track(user_id, query=query, limit=5)
-        except SpotifyClientError as exc:
-            logger.error("Spotify track search failed for query '%s': %s", query, exc)
-            await status_message.edit_text(f"Spotify search failed: {exc!s}")
-            return
+        async with semaphore:
+            try:
+                return await _cached_search(spotify, user_id, query, limit=5)
+            except SpotifyClientError as exc:
+                logger.error("Spotify track search failed for query '%s': %s", query, exc)
+                raise
 
+    try:
+        results = await asyncio.gather(*(_search(planned) for planned in suggestions))
+    except SpotifyClientError as exc:
+        await status_message.edit_text(f"Spotify search failed: {exc!s}")
+        return
+
+    for planned, search_results in zip(suggestions, results, strict=True):
         best = _select_best_track(search_results, planned)
         if best is None:
             missing_tracks.append(planned)
@@ -170,6 +203,7 @@ async def handle_search_command(message: Message) -> None:
             continue
 
         found_tracks.append((planned, best))
+        _recent_tracks.insert(planned)
         logger.info(
             "Matched '%s - %s' to Spotify track '%s'",
             planned.artist,
@@ -205,10 +239,21 @@ async def handle_search_command(message: Message) -> None:
     except Exception as exc:
         logger.debug("Could not update status message before sending matches: %s", exc)
 
-    for index, (_, track) in enumerate(found_tracks, start=1):
-        prefix = f"#{index}"
-        text = _format_track_message(track, prefix=prefix)
-        await message.answer(text, parse_mode="HTML", disable_web_page_preview=False)
+    # Sent concurrently; the #n prefixes keep the matches readable in any arrival order
+    sends = await asyncio.gather(
+        *(
+            message.answer(
+                _format_track_message(track, prefix=f"#{index}"),
+                parse_mode="HTML",
+                disable_web_page_preview=False,
+            )
+            for index, (_, track) in enumerate(found_tracks, start=1)
+        ),
+        return_exceptions=True,
+    )
+    for sent in sends:
+        if isinstance(sent, Exception):
+            logger.warning("Could not send a /search match: %s", sent)
 
     if missing_tracks:
         missing_summary = _format_missing_tracks(missing_tracks)
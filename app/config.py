@@ -17,6 +17,7 @@ DEFAULT_SPOTIFY_PKCE_ENABLED: Final[bool] = True
 DEFAULT_ANTHROPIC_WEB_SEARCH_ENABLED: Final[bool] = True
 DEFAULT_ANTHROPIC_WEB_SEARCH_MAX_USES: Final[int] = 3
 DEFAULT_ANTHROPIC_MODEL: Final[str] = "claude-sonnet-4-5"
+DEFAULT_ANTHROPIC_MAX_CONCURRENCY: Final[int] = 8
 
 SPOTIFY_SCOPES: Final[tuple[str, ...]] = (
     "user-read-playback-state",
@@ -28,6 +29,9 @@ SPOTIFY_SCOPES: Final[tuple[str, ...]] = (
     "user-read-recently-played",
 )
 
+_TRUTHY: Final[frozenset[str]] = frozenset({"1", "true", "t", "yes", "y"})
+_FALSY: Final[frozenset[str]] = frozenset({"0", "false", "f", "no", "n"})
+
 
 load_dotenv()
 
@@ -48,9 +52,9 @@ def _bool(name: str, default: bool) -> bool:
     if raw is None:
         return default
     normalized = raw.strip().lower()
-    if normalized in {"1", "true", "t", "yes", "y"}:
+    if normalized in _TRUTHY:
         return True
-    if normalized in {"0", "false", "f", "no", "n"}:
+    if normalized in _FALSY:
         return False
     raise ConfigurationError(
         f"Environment variable '{name}' must be a boolean-like value (true/false)."
@@ -102,6 +106,7 @@ class Settings:
     anthropic_model: str
     anthropic_web_search_enabled: bool
     anthropic_web_search_max_uses: int
+    anthropic_max_concurrency: int
 
     db_path: Path
     encryption_key: str | None
@@ -132,6 +137,9 @@ class Settings:
             anthropic_web_search_max_uses=_int(
                 "ANTHROPIC_WEB_SEARCH_MAX_USES", DEFAULT_ANTHROPIC_WEB_SEARCH_MAX_USES
             ),
+            anthropic_max_concurrency=max(
+                1, _int("ANTHROPIC_MAX_CONCURRENCY", DEFAULT_ANTHROPIC_MAX_CONCURRENCY)
+            ),
             db_path=Path(getenv("DB_PATH", DEFAULT_DB_PATH)),
             encryption_key=(getenv("ENCRYPTION_KEY") or None),
             administrator_user_id=admin_id,
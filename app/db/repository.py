@@ -2,11 +2,14 @@
 
 from __future__ import annotations
 
+import time
 from collections.abc import AsyncIterator
 from contextlib import asynccontextmanager
 from dataclasses import dataclass
 from datetime import UTC, datetime
+from functools import lru_cache
 from pathlib import Path
+from typing import Any
 
 import aiosqlite
 
@@ -33,7 +36,12 @@ class SpotifyTokens:
     refresh_token: str | None
     scope: str
     token_type: str
-    expires_at: datetime
+    expires_at_epoch: int
+
+    @property
+    def expires_at(self) -> datetime:
+        """Expiry as an aware UTC datetime, built on demand from ``expires_at_epoch``."""
+        return datetime.fromtimestamp(self.expires_at_epoch, tz=UTC)
 
 
 @dataclass(slots=True)
@@ -67,71 +75,156 @@ class BotStats:
     users_today: int
 
 
-@asynccontextmanager
-async def connect(db_path: Path) -> AsyncIterator[aiosqlite.Connection]:
-    """Yield an aiosqlite connection with foreign keys enforced."""
+# Idle connections kept per database file. With WAL, readers and the single writer don't
+# block each other, so a handful covers the concurrent /mix, auth and token lookups.
+POOL_MAX_IDLE = 4
+
+_idle_connections: dict[Path, list[aiosqlite.Connection]] = {}
+
+# Mix quotas reset on UTC day boundaries, so Unix seconds // this is the quota day.
+SECONDS_PER_DAY = 86_400
+
+
+async def open_connection(db_path: Path) -> aiosqlite.Connection:
+    """Open a long-lived aiosqlite connection with foreign keys enforced.
+
+    The caller owns the connection and must close it.
+    """
 
     connection = await aiosqlite.connect(str(db_path))
     connection.row_factory = aiosqlite.Row
-    await connection.execute("PRAGMA foreign_keys = ON;")
+    # WAL itself is enabled once per database file by schema.ensure_schema; the rest is
+    # per connection and sent as one script to save worker-thread round trips.
+    await connection.executescript(
+        """
+        PRAGMA foreign_keys = ON;
+        PRAGMA synchronous = NORMAL;
+        PRAGMA temp_store = MEMORY;
+        PRAGMA cache_size = -20000;
+        PRAGMA mmap_size = 268435456;
+        """
+    )
+    return connection
+
+
+@asynccontextmanager
+async def connect(db_path: Path) -> AsyncIterator[aiosqlite.Connection]:
+    """Yield a pooled aiosqlite connection with foreign keys enforced.
+
+    Uncommitted work is rolled back before the connection goes back to the pool.
+    """
+
+    idle = _idle_connections.setdefault(db_path, [])
+    connection = idle.pop() if idle else await open_connection(db_path)
     try:
         yield connection
     finally:
+        await _release_connection(idle, connection)
+
+
+async def _release_connection(
+    idle: list[aiosqlite.Connection], connection: aiosqlite.Connection
+) -> None:
+    try:
+        if connection.in_transaction:
+            await connection.rollback()
+    except aiosqlite.Error:
+        await connection.close()
+        return
+    if len(idle) < POOL_MAX_IDLE:
+        idle.append(connection)
+    else:
         await connection.close()
 
 
+@asynccontextmanager
+async def transaction(connection: aiosqlite.Connection) -> AsyncIterator[None]:
+    """Run the block as one ``BEGIN IMMEDIATE`` transaction: commit on success, else roll back.
+
+    IMMEDIATE takes the write lock up front, so concurrent writers queue on the busy
+    timeout instead of deadlocking when a deferred read would upgrade to a write.
+    """
+
+    await connection.execute("BEGIN IMMEDIATE")
+    try:
+        yield
+    except BaseException:
+        await connection.rollback()
+        raise
+    await connection.commit()
+
+
+async def close_pool() -> None:
+    """Close every idle pooled connection, e.g. on shutdown."""
+
+    while _idle_connections:
+        _, idle = _idle_connections.popitem()
+        for connection in idle:
+            await connection.close()
+
+
+async def _fetch_one(
+    connection: aiosqlite.Connection, sql: str, parameters: tuple[Any, ...] = ()
+) -> aiosqlite.Row | None:
+    """Run ``sql`` and return its first row, in one hop to the aiosqlite worker thread.
+
+    ``execute`` + ``fetchone`` + ``close`` would queue three separate operations.
+    """
+
+    rows = await connection.execute_fetchall(sql, parameters)
+    return next(iter(rows), None)
+
+
+async def _fetch_scalar(
+    connection: aiosqlite.Connection, sql: str, parameters: tuple[Any, ...] = ()
+) -> Any:
+    """Return the first column of the first row, or None when there are no rows."""
+
+    row = await _fetch_one(connection, sql, parameters)
+    return row[0] if row is not None else None
+
+
 async def get_user_id_by_telegram_id(
     connection: aiosqlite.Connection, telegram_id: int
 ) -> int | None:
     """Return the internal user id for a given Telegram user id, if it exists."""
 
-    cursor = await connection.execute("SELECT id FROM users WHERE telegram_id = ?", (telegram_id,))
-    row = await cursor.fetchone()
-    await cursor.close()
-    return int(row["id"]) if row is not None else None
+    user_id = await _fetch_scalar(
+        connection, "SELECT id FROM users WHERE telegram_id = ?", (telegram_id,)
+    )
+    return int(user_id) if user_id is not None else None
 
 
 async def get_telegram_id_by_user_id(connection: aiosqlite.Connection, user_id: int) -> int | None:
     """Return the Telegram user id for a given internal user id, if it exists."""
 
-    cursor = await connection.execute("SELECT telegram_id FROM users WHERE id = ?", (user_id,))
-    row = await cursor.fetchone()
-    await cursor.close()
-    return int(row["telegram_id"]) if row is not None else None
+    telegram_id = await _fetch_scalar(
+        connection, "SELECT telegram_id FROM users WHERE id = ?", (user_id,)
+    )
+    return int(telegram_id) if telegram_id is not None else None
 
 
 async def ensure_user(connection: aiosqlite.Connection, profile: UserProfile) -> int:
     """Return an internal user id for the provided Telegram profile."""
 
-    cursor = await connection.execute(
-        "SELECT id FROM users WHERE telegram_id = ?", (profile.telegram_id,)
-    )
-    row = await cursor.fetchone()
-    await cursor.close()
-
-    if row is not None:
-        await connection.execute(
-            """
-            UPDATE users
-               SET username = ?, first_name = ?, last_name = ?, updated_at = datetime('now')
-             WHERE id = ?
-            """,
-            (profile.username, profile.first_name, profile.last_name, row["id"]),
-        )
-        return int(row["id"])
-
-    cursor = await connection.execute(
+    # One round trip for both new and returning users; RETURNING needs SQLite 3.35+
+    row = await _fetch_one(
+        connection,
         """
         INSERT INTO users (telegram_id, username, first_name, last_name)
         VALUES (?, ?, ?, ?)
+        ON CONFLICT(telegram_id) DO UPDATE SET
+            username = excluded.username,
+            first_name = excluded.first_name,
+            last_name = excluded.last_name,
+            updated_at = datetime('now')
+        RETURNING id
         """,
         (profile.telegram_id, profile.username, profile.first_name, profile.last_name),
     )
-    last_row_id = cursor.lastrowid
-    await cursor.close()
-    if last_row_id is None:
-        raise RuntimeError("Failed to get lastrowid after insert")
-    return int(last_row_id)
+    if row is None:
+        raise RuntimeError("Failed to upsert user")
+    return int(row["id"])
 
 
 async def insert_auth_state(
@@ -155,7 +248,8 @@ async def insert_auth_state(
 async def fetch_auth_state(connection: aiosqlite.Connection, state: str) -> AuthState | None:
     """Return the stored code verifier for the provided Spotify state, if any."""
 
-    cursor = await connection.execute(
+    row = await _fetch_one(
+        connection,
         """
         SELECT state, code_verifier, user_id
           FROM auth_states
@@ -163,8 +257,6 @@ async def fetch_auth_state(connection: aiosqlite.Connection, state: str) -> Auth
         """,
         (state,),
     )
-    row = await cursor.fetchone()
-    await cursor.close()
     if row is None:
         return None
     user_id = row["user_id"]
@@ -182,162 +274,155 @@ async def delete_auth_state(connection: aiosqlite.Connection, state: str) -> Non
 
 
 def _row_to_tokens(row: aiosqlite.Row) -> SpotifyTokens:
-    expires_at = datetime.fromtimestamp(row["expires_at"], tz=UTC)
     return SpotifyTokens(
         user_id=row["user_id"],
         access_token=row["access_token"],
         refresh_token=row["refresh_token"],
         scope=row["scope"],
         token_type=row["token_type"],
-        expires_at=expires_at,
+        expires_at_epoch=row["expires_at"],
     )
 
 
 def _normalize_datetime(value: datetime) -> datetime:
+    if value.tzinfo is UTC:
+        return value
     if value.tzinfo is None:
         return value.replace(tzinfo=UTC)
     return value.astimezone(UTC)
 
 
-async def check_mix_rate_limit(
-    connection: aiosqlite.Connection,
-    *,
-    user_id: int,
-    now: datetime,
-    daily_limit: int = 20,
-    cooldown_seconds: int = 30,
-    processing_ttl_seconds: int = 60,
-) -> MixRateLimitResult:
-    """Check rate limits for the /mix command."""
+@lru_cache(maxsize=1)
+def _iso_date_for_day(day: int) -> str:
+    return datetime.fromtimestamp(day * SECONDS_PER_DAY, UTC).date().isoformat()
 
-    normalized_now = _normalize_datetime(now)
-    current_ts = int(normalized_now.timestamp())
-    request_date = normalized_now.date().isoformat()
 
-    await connection.execute(
-        """
-        INSERT INTO mix_rate_limits (user_id, request_date)
-        VALUES (?, ?)
-        ON CONFLICT(user_id, request_date) DO NOTHING
-        """,
-        (user_id, request_date),
-    )
+def _today_iso(current_ts: int | None = None) -> str:
+    """Return the UTC date of ``current_ts`` (default: now), formatted once per day."""
+    if current_ts is None:
+        current_ts = int(time.time())
+    return _iso_date_for_day(current_ts // SECONDS_PER_DAY)
 
-    cursor = await connection.execute(
-        """
-        SELECT request_count, last_request_at, processing_until
-          FROM mix_rate_limits
-         WHERE user_id = ? AND request_date = ?
-        """,
-        (user_id, request_date),
-    )
-    row = await cursor.fetchone()
-    await cursor.close()
 
-    if row is None:
-        # Row should always exist thanks to INSERT DO NOTHING above.
-        return MixRateLimitResult(True, None, request_date)
+def to_epoch(value: datetime | int) -> int:
+    """Return ``value`` as integer Unix seconds; naive datetimes are taken as UTC."""
+    if isinstance(value, int):
+        return value
+    return int(_normalize_datetime(value).timestamp())
 
-    processing_until = row["processing_until"]
-    if processing_until is not None and processing_until <= current_ts:
-        await connection.execute(
-            """
-            UPDATE mix_rate_limits
-               SET processing_until = NULL
-             WHERE user_id = ? AND request_date = ?
-            """,
-            (user_id, request_date),
-        )
-        processing_until = None
+
+def _mix_rejection_reason(
+    *,
+    request_count: int,
+    last_request_at: int | None,
+    processing_until: int | None,
+    current_ts: int,
+    daily_limit: int,
+    cooldown_seconds: int,
+) -> str | None:
+    """Return why a /mix request is refused, or ``None`` if it may proceed."""
 
     if processing_until is not None and processing_until > current_ts:
         remaining = processing_until - current_ts
-        reason = "We're working on the previous one, bro. Give me a minute."
-        if remaining > 0:
-            reason = f"We're working on the previous one, bro. Give me about {remaining}s."
-        return MixRateLimitResult(False, reason, request_date)
+        return f"We're working on the previous one, bro. Give me about {remaining}s."
 
-    request_count = row["request_count"] or 0
     if request_count >= daily_limit:
-        return MixRateLimitResult(
-            False,
-            "That's enough vibes for today, bro. Max 20 mixes per day.",
-            request_date,
-        )
+        return "That's enough vibes for today, bro. Max 20 mixes per day."
 
-    last_request_at = row["last_request_at"]
     if last_request_at is not None and current_ts - last_request_at < cooldown_seconds:
-        wait_seconds = cooldown_seconds - (current_ts - last_request_at)
-        wait_seconds = max(wait_seconds, 1)
-        return MixRateLimitResult(
-            False,
-            f"Slow down bro. Wait {wait_seconds}s before the next mix.",
-            request_date,
-        )
+        wait_seconds = max(cooldown_seconds - (current_ts - last_request_at), 1)
+        return f"Slow down bro. Wait {wait_seconds}s before the next mix."
 
-    return MixRateLimitResult(True, None, request_date)
+    return None
 
 
-async def increment_mix_request(
+async def try_admit_mix(
     connection: aiosqlite.Connection,
     *,
     user_id: int,
-    request_date: str,
-    now: datetime,
-) -> None:
-    """Increment daily counter and refresh last request timestamp."""
+    now: datetime | None = None,
+    daily_limit: int = 20,
+    cooldown_seconds: int = 30,
+    processing_ttl_seconds: int = 60,
+) -> MixRateLimitResult:
+    """Admit a /mix request, counting it and marking it as processing in one statement.
 
-    normalized_now = _normalize_datetime(now)
-    current_ts = int(normalized_now.timestamp())
-    await connection.execute(
+    The upsert only updates the row when every limit passes, so an admitted request
+    costs a single write; the follow-up read happens only on the rejection path.
+    """
+
+    current_ts = int(time.time()) if now is None else to_epoch(now)
+    request_date = _today_iso(current_ts)
+
+    admitted = await _fetch_one(
+        connection,
         """
-        UPDATE mix_rate_limits
-           SET request_count = request_count + 1,
-               last_request_at = ?
-         WHERE user_id = ? AND request_date = ?
+        INSERT INTO mix_rate_limits (
+            user_id, request_date, request_count, last_request_at, processing_until
+        )
+        VALUES (?, ?, 1, ?, ?)
+        ON CONFLICT(user_id, request_date) DO UPDATE SET
+            request_count = request_count + 1,
+            last_request_at = excluded.last_request_at,
+            processing_until = excluded.processing_until
+         WHERE (processing_until IS NULL OR processing_until <= ?)
+           AND request_count < ?
+           AND (last_request_at IS NULL OR last_request_at <= ?)
+        RETURNING request_count
         """,
-        (current_ts, user_id, request_date),
+        (
+            user_id,
+            request_date,
+            current_ts,
+            current_ts + processing_ttl_seconds,
+            current_ts,
+            daily_limit,
+            current_ts - cooldown_seconds,
+        ),
     )
+    if admitted is not None:
+        return MixRateLimitResult(True, None, request_date)
 
-
-async def mark_mix_processing(
-    connection: aiosqlite.Connection,
-    *,
-    user_id: int,
-    request_date: str,
-    now: datetime,
-    ttl_seconds: int = 60,
-) -> int:
-    """Mark a user as actively processing a /mix request."""
-
-    normalized_now = _normalize_datetime(now)
-    expires_at = int(normalized_now.timestamp()) + ttl_seconds
-    await connection.execute(
+    row = await _fetch_one(
+        connection,
         """
-        UPDATE mix_rate_limits
-           SET processing_until = ?
+        SELECT request_count, last_request_at, processing_until
+          FROM mix_rate_limits
          WHERE user_id = ? AND request_date = ?
         """,
-        (expires_at, user_id, request_date),
+        (user_id, request_date),
     )
-    return expires_at
+    reason = None
+    if row is not None:
+        reason = _mix_rejection_reason(
+            request_count=row["request_count"] or 0,
+            last_request_at=row["last_request_at"],
+            processing_until=row["processing_until"],
+            current_ts=current_ts,
+            daily_limit=daily_limit,
+            cooldown_seconds=cooldown_seconds,
+        )
+    return MixRateLimitResult(False, reason or "Too many mixes right now, bro.", request_date)
 
 
-async def clear_mix_processing(
+async def finalize_mix(
     connection: aiosqlite.Connection,
     *,
     user_id: int,
     request_date: str,
+    now: datetime | None = None,
 ) -> None:
-    """Clear the processing flag for a user."""
+    """Release the processing flag and start the cooldown from when the mix finished."""
 
+    current_ts = int(time.time()) if now is None else to_epoch(now)
     await connection.execute(
         """
         UPDATE mix_rate_limits
-           SET processing_until = NULL
+           SET processing_until = NULL,
+               last_request_at = ?
          WHERE user_id = ? AND request_date = ?
         """,
-        (user_id, request_date),
+        (current_ts, user_id, request_date),
     )
 
 
@@ -349,11 +434,11 @@ async def upsert_spotify_tokens(
     refresh_token: str | None,
     scope: str,
     token_type: str,
-    expires_at: datetime,
+    expires_at: datetime | int,
 ) -> None:
     """Insert or update Spotify tokens for a given user."""
 
-    expires_epoch = int(_normalize_datetime(expires_at).timestamp())
+    expires_epoch = to_epoch(expires_at)
     await connection.execute(
         """
         INSERT INTO spotify_tokens (
@@ -382,7 +467,8 @@ async def get_spotify_tokens(
 ) -> SpotifyTokens | None:
     """Return Spotify tokens for a user, if stored."""
 
-    cursor = await connection.execute(
+    row = await _fetch_one(
+        connection,
         """
         SELECT user_id, access_token, refresh_token, scope, token_type, expires_at
           FROM spotify_tokens
@@ -390,8 +476,6 @@ async def get_spotify_tokens(
         """,
         (user_id,),
     )
-    row = await cursor.fetchone()
-    await cursor.close()
     if row is None:
         return None
     return _row_to_tokens(row)
@@ -402,13 +486,13 @@ async def update_access_token(
     *,
     user_id: int,
     access_token: str,
-    expires_at: datetime,
+    expires_at: datetime | int,
     scope: str | None = None,
     token_type: str | None = None,
 ) -> None:
     """Refresh the short-lived access token while leaving refresh token intact."""
 
-    expires_epoch = int(_normalize_datetime(expires_at).timestamp())
+    expires_epoch = to_epoch(expires_at)
     await connection.execute(
         """
         UPDATE spotify_tokens
@@ -429,42 +513,69 @@ async def delete_spotify_tokens(connection: aiosqlite.Connection, user_id: int)
     await connection.execute("DELETE FROM spotify_tokens WHERE user_id = ?", (user_id,))
 
 
-async def get_bot_stats(connection: aiosqlite.Connection) -> BotStats:
-    """Return overall bot statistics."""
+async def get_playlist_plan(
+    connection: aiosqlite.Connection, plan_key: str, *, not_before: datetime
+) -> str | None:
+    """Return a cached playlist plan payload created at or after ``not_before``."""
 
-    # Total users
-    cursor = await connection.execute("SELECT COUNT(*) as count FROM users")
-    row = await cursor.fetchone()
-    total_users = int(row["count"]) if row else 0
-    await cursor.close()
+    row = await _fetch_one(
+        connection,
+        """
+        SELECT plan_json
+          FROM playlist_plans
+         WHERE plan_key = ? AND created_at >= ?
+        """,
+        (plan_key, int(_normalize_datetime(not_before).timestamp())),
+    )
+    return str(row["plan_json"]) if row is not None else None
 
-    # Users with Spotify connected
-    cursor = await connection.execute("SELECT COUNT(*) as count FROM spotify_tokens")
-    row = await cursor.fetchone()
-    users_with_spotify = int(row["count"]) if row else 0
-    await cursor.close()
 
-    # Total mix requests
-    cursor = await connection.execute("SELECT SUM(request_count) as total FROM mix_rate_limits")
-    row = await cursor.fetchone()
-    total_mix_requests = int(row["total"]) if row and row["total"] else 0
-    await cursor.close()
+async def store_playlist_plan(
+    connection: aiosqlite.Connection,
+    *,
+    plan_key: str,
+    plan_json: str,
+    now: datetime,
+    prune_before: datetime,
+) -> None:
+    """Cache a playlist plan payload and drop entries older than ``prune_before``."""
 
-    # Users who made requests today
-    today = datetime.now(UTC).date().isoformat()
-    cursor = await connection.execute(
-        "SELECT COUNT(DISTINCT user_id) as count FROM mix_rate_limits WHERE request_date = ?",
+    await connection.execute(
+        "DELETE FROM playlist_plans WHERE created_at < ?",
+        (int(_normalize_datetime(prune_before).timestamp()),),
+    )
+    await connection.execute(
+        """
+        INSERT INTO playlist_plans (plan_key, plan_json, created_at)
+        VALUES (?, ?, ?)
+        ON CONFLICT(plan_key) DO UPDATE SET
+            plan_json = excluded.plan_json,
+            created_at = excluded.created_at
+        """,
+        (plan_key, plan_json, int(_normalize_datetime(now).timestamp())),
+    )
+
+
+async def get_bot_stats(connection: aiosqlite.Connection) -> BotStats:
+    """Return overall bot statistics."""
+
+    today = _today_iso()
+    total_users = await _fetch_scalar(connection, "SELECT COUNT(*) FROM users")
+    users_with_spotify = await _fetch_scalar(connection, "SELECT COUNT(*) FROM spotify_tokens")
+    total_mix_requests = await _fetch_scalar(
+        connection, "SELECT SUM(request_count) FROM mix_rate_limits"
+    )
+    users_today = await _fetch_scalar(
+        connection,
+        "SELECT COUNT(DISTINCT user_id) FROM mix_rate_limits WHERE request_date = ?",
         (today,),
     )
-    row = await cursor.fetchone()
-    users_today = int(row["count"]) if row else 0
-    await cursor.close()
 
     return BotStats(
-        total_users=total_users,
-        users_with_spotify=users_with_spotify,
-        total_mix_requests=total_mix_requests,
-        users_today=users_today,
+        total_users=int(total_users or 0),
+        users_with_spotify=int(users_with_spotify or 0),
+        total_mix_requests=int(total_mix_requests or 0),
+        users_today=int(users_today or 0),
     )
 
 
@@ -530,21 +641,25 @@ __all__ = [
     "SpotifyTokens",
     "UserProfile",
     "UserStats",
-    "check_mix_rate_limit",
-    "clear_mix_processing",
+    "close_pool",
     "connect",
     "delete_auth_state",
     "delete_spotify_tokens",
     "ensure_user",
     "fetch_auth_state",
+    "finalize_mix",
     "get_bot_stats",
+    "get_playlist_plan",
     "get_recent_users",
     "get_spotify_tokens",
     "get_telegram_id_by_user_id",
     "get_user_id_by_telegram_id",
-    "increment_mix_request",
     "insert_auth_state",
-    "mark_mix_processing",
+    "open_connection",
+    "store_playlist_plan",
+    "to_epoch",
+    "transaction",
+    "try_admit_mix",
     "update_access_token",
     "upsert_spotify_tokens",
 ]
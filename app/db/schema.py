@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+from collections.abc import Sequence
 from dataclasses import dataclass
 from pathlib import Path
 
@@ -26,7 +27,7 @@ SCHEMA_STATEMENTS: tuple[str, ...] = (
         code_verifier TEXT NOT NULL,
         created_at TEXT NOT NULL DEFAULT (datetime('now')),
         FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
-    );
+    ) WITHOUT ROWID;
     """.strip(),
     """
     CREATE TABLE IF NOT EXISTS spotify_tokens (
@@ -49,11 +50,47 @@ SCHEMA_STATEMENTS: tuple[str, ...] = (
         processing_until INTEGER,
         PRIMARY KEY (user_id, request_date),
         FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
+    ) WITHOUT ROWID;
+    """.strip(),
+    """
+    CREATE TABLE IF NOT EXISTS playlist_plans (
+        plan_key TEXT PRIMARY KEY,
+        plan_json TEXT NOT NULL,
+        created_at INTEGER NOT NULL
     );
     """.strip(),
 )
 
 
+# Tables keyed by their primary key alone, so they are clustered on it (WITHOUT ROWID).
+# Databases created before that still have rowid tables, which apply_schema rebuilds.
+CLUSTERED_TABLES: tuple[str, ...] = ("auth_states", "mix_rate_limits")
+
+
+def _schema_script(rowid_tables: Sequence[str]) -> str:
+    """Build one transaction that applies the schema and rebuilds ``rowid_tables``.
+
+    Each legacy table is renamed out of the way, recreated by its CREATE statement, then
+    refilled from the old copy, so the schema is applied whole or not at all.
+    """
+    renames = [f"ALTER TABLE {name} RENAME TO {name}_rowid;" for name in rowid_tables]
+    # Table names only ever come from CLUSTERED_TABLES, never from input
+    copies = [
+        f"INSERT INTO {name} SELECT * FROM {name}_rowid;\nDROP TABLE {name}_rowid;"  # noqa: S608
+        for name in rowid_tables
+    ]
+    return "\n".join(["BEGIN;", *renames, *SCHEMA_STATEMENTS, *copies, "COMMIT;"])
+
+
+async def _rowid_tables(connection: aiosqlite.Connection) -> list[str]:
+    placeholders = ", ".join("?" for _ in CLUSTERED_TABLES)
+    rows = await connection.execute_fetchall(
+        f"SELECT name, sql FROM sqlite_master WHERE type = 'table' AND name IN ({placeholders})",  # noqa: S608
+        CLUSTERED_TABLES,
+    )
+    return [name for name, sql in rows if "WITHOUT ROWID" not in sql.upper()]
+
+
 @dataclass(slots=True, frozen=True)
 class SchemaStats:
     """Execution statistics for schema migrations."""
@@ -64,22 +101,18 @@ class SchemaStats:
 async def apply_schema(connection: aiosqlite.Connection) -> SchemaStats:
     """Apply idempotent schema statements to the connected SQLite database."""
 
-    count = 0
-    for statement in SCHEMA_STATEMENTS:
-        await connection.execute(statement)
-        count += 1
-    return SchemaStats(statements_executed=count)
+    await connection.executescript(_schema_script(await _rowid_tables(connection)))
+    return SchemaStats(statements_executed=len(SCHEMA_STATEMENTS))
 
 
 async def ensure_schema(db_path: Path) -> SchemaStats:
-    """Open a connection, apply the schema, and close the connection."""
+    """Open a connection, enable WAL, apply the schema, and close the connection."""
 
     async with aiosqlite.connect(str(db_path)) as connection:
-        connection.row_factory = aiosqlite.Row
-        await connection.execute("PRAGMA foreign_keys = ON;")
-        stats = await apply_schema(connection)
-        await connection.commit()
-    return stats
+        # WAL is persistent per database file, so it only has to be switched on here. It
+        # can't change inside a transaction, so the pragmas run ahead of the schema's BEGIN.
+        await connection.executescript("PRAGMA journal_mode = WAL;\nPRAGMA foreign_keys = ON;")
+        return await apply_schema(connection)
 
 
-__all__ = ["SCHEMA_STATEMENTS", "SchemaStats", "apply_schema", "ensure_schema"]
+__all__ = ["CLUSTERED_TABLES", "SCHEMA_STATEMENTS", "SchemaStats", "apply_schema", "ensure_schema"]
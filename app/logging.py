@@ -3,7 +3,9 @@
 from __future__ import annotations
 
 import logging
+import logging.config
 import os
+from functools import lru_cache
 from typing import Final
 
 _DEFAULT_LEVEL: Final[int] = logging.INFO
@@ -20,6 +22,7 @@ _LEVEL_MAP: Final[dict[str, int]] = {
 }
 
 
+@lru_cache(maxsize=1)
 def _get_log_level() -> int:
     """Get log level from LOG_LEVEL environment variable."""
     level_str = os.getenv("LOG_LEVEL", "").strip().upper()
@@ -49,7 +52,19 @@ def setup_logging(level: int | None = None) -> None:
         root_logger.setLevel(level)
         return
 
-    logging.basicConfig(level=level, format=_DEFAULT_FORMAT, datefmt=_DEFAULT_DATEFMT)
+    logging.config.dictConfig(
+        {
+            "version": 1,
+            "disable_existing_loggers": False,
+            "formatters": {
+                "default": {"format": _DEFAULT_FORMAT, "datefmt": _DEFAULT_DATEFMT},
+            },
+            "handlers": {
+                "console": {"class": "logging.StreamHandler", "formatter": "default"},
+            },
+            "root": {"level": level, "handlers": ["console"]},
+        }
+    )
 
 
 __all__ = ["setup_logging"]
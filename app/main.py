@@ -7,7 +7,8 @@ import asyncio
 import logging
 import os
 import signal
-from collections.abc import Sequence
+import sys
+from collections.abc import Callable, Sequence
 from contextlib import suppress
 
 from aiogram import Bot, Dispatcher
@@ -16,9 +17,12 @@ from aiogram.enums import ParseMode
 from aiogram.types import BotCommand
 from fastapi import FastAPI
 
+from .ai import claude_client
+from .ai.playlist_planner import ClaudePlaylistPlanner
+from .ai.track_searcher import ClaudeTrackSearcher
 from .bot import commands, playback, playlists, search
 from .config import Settings, load_settings
-from .db import schema
+from .db import repository, schema
 from .logging import setup_logging
 from .spotify.client import RepositoryTokenStore, SpotifyClient
 from .web import create_web_app
@@ -27,6 +31,8 @@ logger = logging.getLogger(__name__)
 
 DEFAULT_COMBINED_HOST = os.getenv("WEB_HOST", "0.0.0.0")  # noqa: S104
 DEFAULT_COMBINED_PORT = int(os.getenv("PORT", "8000"))
+# Grace period for the web server and bot polling to stop before they are cancelled.
+SHUTDOWN_TIMEOUT = 5.0
 
 
 def create_app() -> FastAPI:
@@ -50,6 +56,25 @@ def _configure_bot(
     bot.settings = settings  # type: ignore[attr-defined]
     bot.token_store = token_store  # type: ignore[attr-defined]
     bot.spotify_client = spotify_client  # type: ignore[attr-defined]
+    bot.track_searcher = (  # type: ignore[attr-defined]
+        ClaudeTrackSearcher(
+            api_key=settings.anthropic_api_key,
+            model=settings.anthropic_model,
+            max_concurrency=settings.anthropic_max_concurrency,
+        )
+        if settings.anthropic_api_key
+        else None
+    )
+    bot.playlist_planner = (  # type: ignore[attr-defined]
+        ClaudePlaylistPlanner(
+            api_key=settings.anthropic_api_key,
+            model=settings.anthropic_model,
+            web_search=settings.anthropic_web_search_enabled,
+            max_concurrency=settings.anthropic_max_concurrency,
+        )
+        if settings.anthropic_api_key
+        else None
+    )
 
     dp = Dispatcher()
     dp.include_router(commands.router)
@@ -59,6 +84,21 @@ def _configure_bot(
     return bot, dp, spotify_client, token_store
 
 
+async def _warm_connections(settings: Settings, spotify_client: SpotifyClient) -> None:
+    """Open the Claude and Spotify connections at startup; keep-alive does the rest."""
+
+    warm_ups = [spotify_client.warm_up()]
+    if settings.anthropic_api_key:
+        warm_ups.append(claude_client.warm_up())
+    await asyncio.gather(*warm_ups)
+
+
+async def _cancel_task(task: asyncio.Task[None]) -> None:
+    task.cancel()
+    with suppress(asyncio.CancelledError):
+        await task
+
+
 async def _set_bot_commands(bot: Bot) -> None:
     """Set bot commands for command suggestions in Telegram."""
     bot_commands = [
@@ -81,20 +121,21 @@ async def _start_bot_polling(
     *,
     stop_event: asyncio.Event | None = None,
 ) -> None:
-    async def _stop_signal() -> bool:
-        if stop_event is None:
-            return False
-        # Check if event is set without waiting
-        if stop_event.is_set():
-            return True
-        # Use a very short timeout to check periodically
-        try:
-            await asyncio.wait_for(stop_event.wait(), timeout=0.1)
-            return True
-        except TimeoutError:
-            return False
-
-    await dispatcher.start_polling(bot, handle_signals=False, stop_signal=_stop_signal)
+    if stop_event is None:
+        await dispatcher.start_polling(bot, handle_signals=False)
+        return
+
+    async def _stop_when_signalled() -> None:
+        await stop_event.wait()
+        # Raises if polling hasn't started yet or already ended; either way it isn't running
+        with suppress(RuntimeError):
+            await dispatcher.stop_polling()
+
+    stopper = asyncio.create_task(_stop_when_signalled(), name="telegram-bot-stopper")
+    try:
+        await dispatcher.start_polling(bot, handle_signals=False)
+    finally:
+        await _cancel_task(stopper)
 
 
 async def run_bot() -> None:
@@ -110,6 +151,9 @@ async def run_bot() -> None:
     logger.info("  Login URL: %s/spotify/login", settings.web_base_url)
     await schema.ensure_schema(settings.db_path)
     bot, dispatcher, spotify_client, _ = _configure_bot(settings)
+    warm_task = asyncio.create_task(
+        _warm_connections(settings, spotify_client), name="connection-warmer"
+    )
 
     try:
         await _set_bot_commands(bot)
@@ -117,7 +161,10 @@ async def run_bot() -> None:
         await _start_bot_polling(dispatcher, bot)
     finally:
         logger.info("Shutting down Telegram bot")
+        await _cancel_task(warm_task)
         await spotify_client.aclose()
+        await claude_client.close_client()
+        await repository.close_pool()
         await bot.session.close()
 
 
@@ -143,7 +190,6 @@ async def run_combined(
 
     loop = asyncio.get_running_loop()
     stop_event = asyncio.Event()
-    shutdown_initiated = False
 
     config = uvicorn.Config(
         "app.main:app",
@@ -158,6 +204,9 @@ async def run_combined(
     async def _run_web() -> None:
         await server.serve()
 
+    warm_task = asyncio.create_task(
+        _warm_connections(settings, spotify_client), name="connection-warmer"
+    )
     bot_task = asyncio.create_task(
         _start_bot_polling(dispatcher, bot, stop_event=stop_event),
         name="telegram-bot",
@@ -166,17 +215,10 @@ async def run_combined(
     tasks = {bot_task, web_task}
 
     def _trigger_stop() -> None:
-        nonlocal shutdown_initiated
-        if shutdown_initiated:
-            return  # Prevent multiple calls
-        shutdown_initiated = True
+        # Both services wind down on their own once signalled; see the shutdown below
         logger.info("Shutdown signal received; stopping services")
         stop_event.set()
         server.should_exit = True
-        # Cancel tasks asynchronously
-        for task in tasks:
-            if not task.done():
-                task.cancel()
 
     for sig in (signal.SIGINT, signal.SIGTERM):
         with suppress(NotImplementedError):
@@ -198,46 +240,22 @@ async def run_combined(
         stop_event.set()
         server.should_exit = True
 
-        # Temporarily suppress uvicorn/starlette error logging during shutdown
-        uvicorn_logger = logging.getLogger("uvicorn.error")
-        starlette_logger = logging.getLogger("starlette")
-        original_level = uvicorn_logger.level
-        starlette_original_level = starlette_logger.level
-
-        try:
-            uvicorn_logger.setLevel(logging.CRITICAL)
-            starlette_logger.setLevel(logging.CRITICAL)
-
-            # Give services a moment to shut down gracefully
-            await asyncio.sleep(0.1)
-
-            # Wait for tasks to complete naturally first (with a short timeout)
-            try:
-                await asyncio.wait_for(asyncio.gather(*tasks, return_exceptions=True), timeout=1.0)
-            except TimeoutError:
-                # If tasks don't complete naturally, cancel them
-                for task in tasks:
-                    if not task.done():
-                        task.cancel()
-
-                # Wait for cancelled tasks with timeout
-                try:
-                    await asyncio.wait_for(
-                        asyncio.gather(*tasks, return_exceptions=True), timeout=4.0
-                    )
-                except TimeoutError:
-                    logger.warning("Tasks did not complete within timeout, forcing shutdown")
-                    await asyncio.gather(*tasks, return_exceptions=True)
-        finally:
-            # Restore original log levels
-            uvicorn_logger.setLevel(original_level)
-            starlette_logger.setLevel(starlette_original_level)
+        _, pending = await asyncio.wait(tasks, timeout=SHUTDOWN_TIMEOUT)
+        if pending:
+            logger.warning("Services did not stop within %.0fs; cancelling", SHUTDOWN_TIMEOUT)
+            for task in pending:
+                task.cancel()
+        # Also retrieves results, so failures don't resurface as "never retrieved" warnings
+        await asyncio.gather(*tasks, return_exceptions=True)
 
         for sig in (signal.SIGINT, signal.SIGTERM):
             with suppress(NotImplementedError):
                 loop.remove_signal_handler(sig)
         logger.info("Shutting down combined services")
+        await _cancel_task(warm_task)
         await spotify_client.aclose()
+        await claude_client.close_client()
+        await repository.close_pool()
         await bot.session.close()
 
 
@@ -262,16 +280,27 @@ def _parse_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
     return parser.parse_args(argv)
 
 
+def _loop_factory() -> Callable[[], asyncio.AbstractEventLoop] | None:
+    """Return uvloop's event loop factory, or None for asyncio's default on Windows."""
+
+    if sys.platform == "win32":
+        return None
+    import uvloop
+
+    return uvloop.new_event_loop  # type: ignore[no-any-return]
+
+
 def main(argv: Sequence[str] | None = None) -> None:  # pragma: no cover - convenience wrapper
     """Process command-line arguments and launch the application."""
 
     args = _parse_args(argv)
     run_mode = os.getenv("RUN_MODE", "").strip().lower()
+    loop_factory = _loop_factory()
     if args.combined or run_mode == "combined":
-        asyncio.run(run_combined(host=args.host, port=args.port))
+        asyncio.run(run_combined(host=args.host, port=args.port), loop_factory=loop_factory)
         return
 
-    asyncio.run(run_bot())
+    asyncio.run(run_bot(), loop_factory=loop_factory)
 
 
 def run() -> None:  # pragma: no cover - convenience wrapper
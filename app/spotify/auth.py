@@ -5,6 +5,7 @@ from __future__ import annotations
 import base64
 import hashlib
 import secrets
+import time
 from collections.abc import Iterable
 from dataclasses import dataclass
 from datetime import UTC, datetime, timedelta
@@ -218,9 +219,14 @@ def compute_expiry(expires_in: int, *, now: datetime | None = None) -> datetime:
     return base + timedelta(seconds=expires_in)
 
 
-def should_refresh(expires_at: datetime, *, skew_seconds: int = 90) -> bool:
-    """Return True when the token needs a refresh, allowing for clock skew."""
+def should_refresh(expires_at: datetime | int, *, skew_seconds: int = 90) -> bool:
+    """Return True when the token needs a refresh, allowing for clock skew.
 
+    ``expires_at`` may be an integer Unix timestamp, as stored for cached tokens.
+    """
+
+    if isinstance(expires_at, int):
+        return expires_at <= time.time() + skew_seconds
     if expires_at.tzinfo is None:
         expires_at = expires_at.replace(tzinfo=UTC)
     threshold = datetime.now(tz=UTC) + timedelta(seconds=skew_seconds)
@@ -6,12 +6,14 @@ import asyncio
 import json
 import logging
 import re
+import time
 from collections.abc import Callable, Sequence
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime
 from pathlib import Path
 from typing import Any
 
+import aiosqlite
 import httpx
 
 from ..config import Settings
@@ -26,23 +28,94 @@ class SpotifyClientError(RuntimeError):
     """Raised when Spotify API responses indicate an error."""
 
 
+# Token writes through the store (save, refresh, revoke) invalidate the cache, but writes
+# from another process (the web app's OAuth callback) do not; the TTL bounds that
+# staleness, and the refresh and 401 paths re-read the database before acting.
+TOKEN_CACHE_TTL = 300.0
+TOKEN_CACHE_MAX_SIZE = 10_000
+USER_ID_CACHE_MAX_SIZE = 10_000
+# Playback controls re-read "currently playing" right after acting; a state fetched within
+# the last couple of seconds (and patched by play/pause) is as good as a fresh GET.
+PLAYBACK_CACHE_TTL = 2.0
+PLAYBACK_CACHE_MAX_SIZE = 1_000
+# On HTTP 429, wait for Spotify's Retry-After (or back off exponentially when it's absent)
+# a few times; longer waits are surfaced as errors rather than stalling the handler.
+RATE_LIMIT_RETRIES = 3
+RATE_LIMIT_BASE_DELAY = 0.5
+RATE_LIMIT_MAX_WAIT = 10.0
+
+
 @dataclass(slots=True)
 class RepositoryTokenStore:
-    """Simple wrapper around sqlite-backed token persistence."""
+    """Simple wrapper around sqlite-backed token persistence.
+
+    Lookups by Telegram ID are cached for ``cache_ttl`` seconds. Missing tokens are not
+    cached, so a user who just connected Spotify is seen immediately.
+    """
 
     db_path: Path
+    cache_ttl: float = TOKEN_CACHE_TTL
+    _cache: dict[int, tuple[float, repository.SpotifyTokens]] = field(
+        default_factory=dict, init=False, repr=False
+    )
+    # Internal user ID -> Telegram ID of the cached entry, so invalidation is O(1)
+    _telegram_ids: dict[int, int] = field(default_factory=dict, init=False, repr=False)
+    # Telegram ID -> internal user ID. Users are never deleted or renumbered, so entries
+    # never go stale and survive token invalidation; only size bounds them.
+    _user_ids: dict[int, int] = field(default_factory=dict, init=False, repr=False)
+
+    def invalidate(self, user_id: int) -> None:
+        """Drop cached tokens belonging to the given internal user ID."""
+        telegram_id = self._telegram_ids.pop(user_id, None)
+        if telegram_id is not None:
+            self._cache.pop(telegram_id, None)
 
     async def load(self, user_id: int) -> repository.SpotifyTokens | None:
         async with repository.connect(self.db_path) as connection:
             return await repository.get_spotify_tokens(connection, user_id)
 
-    async def load_by_telegram_id(self, telegram_id: int) -> repository.SpotifyTokens | None:
-        """Load tokens by Telegram user ID, converting to internal user ID first."""
+    async def load_by_telegram_id(
+        self, telegram_id: int, *, fresh: bool = False
+    ) -> repository.SpotifyTokens | None:
+        """Load tokens by Telegram user ID, converting to internal user ID first.
+
+        ``fresh=True`` skips the cache and re-reads the database, e.g. before a refresh.
+        """
+        now = time.monotonic()
+        cached = self._cache.get(telegram_id)
+        if not fresh and cached is not None and cached[0] > now:
+            return cached[1]
+
         async with repository.connect(self.db_path) as connection:
-            internal_user_id = await repository.get_user_id_by_telegram_id(connection, telegram_id)
+            internal_user_id = await self._user_id(connection, telegram_id)
             if internal_user_id is None:
                 return None
-            return await repository.get_spotify_tokens(connection, internal_user_id)
+            tokens = await repository.get_spotify_tokens(connection, internal_user_id)
+        self.invalidate_telegram_id(telegram_id)
+        if tokens is not None:
+            if len(self._cache) >= TOKEN_CACHE_MAX_SIZE:
+                # Dicts keep insertion order, so the first key is the least recently loaded.
+                self.invalidate_telegram_id(next(iter(self._cache)))
+            self._cache[telegram_id] = (now + self.cache_ttl, tokens)
+            self._telegram_ids[tokens.user_id] = telegram_id
+        return tokens
+
+    async def _user_id(self, connection: aiosqlite.Connection, telegram_id: int) -> int | None:
+        user_id = self._user_ids.pop(telegram_id, None)
+        if user_id is None:
+            user_id = await repository.get_user_id_by_telegram_id(connection, telegram_id)
+            if user_id is None:
+                return None
+            if len(self._user_ids) >= USER_ID_CACHE_MAX_SIZE:
+                del self._user_ids[next(iter(self._user_ids))]
+        self._user_ids[telegram_id] = user_id  # (re-)insert as most recently used
+        return user_id
+
+    def invalidate_telegram_id(self, telegram_id: int) -> None:
+        """Drop cached tokens for the given Telegram user ID."""
+        cached = self._cache.pop(telegram_id, None)
+        if cached is not None:
+            self._telegram_ids.pop(cached[1].user_id, None)
 
     async def save(
         self,
@@ -52,8 +125,9 @@ class RepositoryTokenStore:
         refresh_token: str | None,
         scope: str,
         token_type: str,
-        expires_at: datetime,
+        expires_at: datetime | int,
     ) -> repository.SpotifyTokens:
+        expires_epoch = repository.to_epoch(expires_at)
         async with repository.connect(self.db_path) as connection:
             await repository.upsert_spotify_tokens(
                 connection,
@@ -62,23 +136,45 @@ class RepositoryTokenStore:
                 refresh_token=refresh_token,
                 scope=scope,
                 token_type=token_type,
-                expires_at=expires_at,
+                expires_at=expires_epoch,
             )
             await connection.commit()
+        self.invalidate(user_id)
         tokens = repository.SpotifyTokens(
             user_id=user_id,
             access_token=access_token,
             refresh_token=refresh_token,
             scope=scope,
             token_type=token_type,
-            expires_at=expires_at,
+            expires_at_epoch=expires_epoch,
         )
         return tokens
 
 
+# Every bot user's playback and search calls go to the same two Spotify hosts, so keep
+# sockets warm and multiplex concurrent requests over HTTP/2.
+HTTP_LIMITS = httpx.Limits(max_connections=128, max_keepalive_connections=32, keepalive_expiry=60.0)
+
+
+def _retry_after_seconds(response: httpx.Response, attempt: int) -> float:
+    """Return how long to wait before retrying a rate-limited request."""
+    header = response.headers.get("Retry-After")
+    if header is not None:
+        try:
+            return max(0.0, float(header))
+        except ValueError:
+            pass
+    return float(RATE_LIMIT_BASE_DELAY * 2**attempt)
+
+
 def _default_http_client() -> httpx.AsyncClient:
-    timeout = httpx.Timeout(10.0, read=10.0)
-    return httpx.AsyncClient(base_url="https://api.spotify.com/v1", timeout=timeout)
+    timeout = httpx.Timeout(10.0, read=10.0, connect=5.0)
+    return httpx.AsyncClient(
+        base_url="https://api.spotify.com/v1",
+        timeout=timeout,
+        limits=HTTP_LIMITS,
+        http2=True,
+    )
 
 
 def _sanitize_text_for_spotify(text: str, max_length: int, fallback: str) -> str:
@@ -157,16 +253,34 @@ class SpotifyClient:
         self._http = http_client_factory()
         self._owns_client = True
         self._cache: dict[int, repository.SpotifyTokens] = {}
+        self._playback_cache: dict[int, tuple[float, dict[str, Any] | None]] = {}
 
     async def aclose(self) -> None:
         if self._owns_client:
             await self._http.aclose()
 
-    async def _get_tokens(self, user_id: int) -> repository.SpotifyTokens:
-        tokens = self._cache.get(user_id)
+    async def warm_up(self) -> None:
+        """Open pooled connections to the Web API and token hosts; responses are ignored."""
+        results = await asyncio.gather(
+            self._http.head("/me"),
+            self._http.head(spotify_auth.TOKEN_URL),
+            return_exceptions=True,
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                logger.debug("Spotify connection warm-up failed: %s", result)
+
+    def invalidate_tokens(self, user_id: int) -> None:
+        """Forget cached tokens for a Telegram user, e.g. after they re-linked Spotify."""
+        self._cache.pop(user_id, None)
+        self._playback_cache.pop(user_id, None)
+        self._token_store.invalidate_telegram_id(user_id)
+
+    async def _get_tokens(self, user_id: int, *, fresh: bool = False) -> repository.SpotifyTokens:
+        tokens = None if fresh else self._cache.get(user_id)
         if tokens is None:
             # user_id is actually telegram_id, load by telegram_id
-            tokens = await self._token_store.load_by_telegram_id(user_id)
+            tokens = await self._token_store.load_by_telegram_id(user_id, fresh=fresh)
             if tokens is None:
                 raise SpotifyClientError("Spotify not authorized for this user")
             self._cache[user_id] = tokens
@@ -183,6 +297,7 @@ class SpotifyClient:
                 client_id=self._client_id,
                 client_secret=self._client_secret,
                 refresh_token=refresh_token,
+                http_client=self._http,
             )
         except RevokedTokenError as exc:
             # Clear revoked tokens from database and cache
@@ -191,6 +306,7 @@ class SpotifyClient:
                 await connection.commit()
             # Clear from cache
             self._cache.pop(user_id, None)
+            self._token_store.invalidate(tokens.user_id)
             # Re-raise with user-friendly message
             raise SpotifyClientError(
                 "Your Spotify authorization has expired. Please reconnect your account using /start"
@@ -212,8 +328,12 @@ class SpotifyClient:
 
     async def _ensure_fresh_tokens(self, user_id: int) -> repository.SpotifyTokens:
         tokens = await self._get_tokens(user_id)
-        if spotify_auth.should_refresh(tokens.expires_at):
-            tokens = await self._refresh_tokens(user_id, tokens)
+        if spotify_auth.should_refresh(tokens.expires_at_epoch):
+            # The user may have re-linked since these were cached; never refresh with a
+            # stale refresh token, as that would overwrite (or, if revoked, delete) the new grant.
+            tokens = await self._get_tokens(user_id, fresh=True)
+            if spotify_auth.should_refresh(tokens.expires_at_epoch):
+                tokens = await self._refresh_tokens(user_id, tokens)
         return tokens
 
     async def _request(
@@ -238,10 +358,8 @@ class SpotifyClient:
 
         if response.status_code == 401 and retry:
             try:
-                # Clear cache before retry to force reload of fresh tokens
-                self._cache.pop(user_id, None)
-                # Reload tokens from DB (might have been updated elsewhere)
-                fresh_tokens = await self._get_tokens(user_id)
+                # Reload tokens from DB, bypassing caches (might have been updated elsewhere)
+                fresh_tokens = await self._get_tokens(user_id, fresh=True)
                 tokens = await self._refresh_tokens(user_id, fresh_tokens)
                 headers["Authorization"] = f"Bearer {tokens.access_token}"
                 response = await self._http.request(method, path, headers=headers, **kwargs)
@@ -250,6 +368,16 @@ class SpotifyClient:
                 # Tokens have already been cleared in _refresh_tokens
                 raise
 
+        attempt = 0
+        while response.status_code == 429 and attempt < RATE_LIMIT_RETRIES:
+            delay = _retry_after_seconds(response, attempt)
+            if delay > RATE_LIMIT_MAX_WAIT:
+                break
+            logger.warning("Spotify rate limited %s %s; retrying in %.1fs", method, path, delay)
+            await asyncio.sleep(delay)
+            attempt += 1
+            response = await self._http.request(method, path, headers=headers, **kwargs)
+
         # Treat any 2xx as success. Some Spotify endpoints may return 200
         # even when docs claim 204, so be permissive here.
         if not (200 <= response.status_code < 300):
@@ -318,15 +446,43 @@ class SpotifyClient:
         return response.json()  # type: ignore[no-any-return]
 
     async def get_currently_playing(self, user_id: int) -> dict[str, Any] | None:
+        now = time.monotonic()
+        cached = self._playback_cache.get(user_id)
+        if cached is not None and cached[0] > now:
+            return cached[1]
+
         response = await self._request(
             user_id,
             "GET",
             "/me/player/currently-playing",
             expected_status=(200, 204),
         )
-        if response.status_code == 204 or not response.content:
+        playback: dict[str, Any] | None = None
+        if response.status_code != 204 and response.content:
+            playback = response.json()
+        self._playback_cache.pop(user_id, None)
+        if len(self._playback_cache) >= PLAYBACK_CACHE_MAX_SIZE:
+            del self._playback_cache[next(iter(self._playback_cache))]
+        self._playback_cache[user_id] = (now + PLAYBACK_CACHE_TTL, playback)
+        return playback
+
+    def cached_playback(self, user_id: int) -> dict[str, Any] | None:
+        """Return the cached now-playing state if it is still fresh, without calling Spotify."""
+        cached = self._playback_cache.get(user_id)
+        if cached is None or cached[0] <= time.monotonic():
             return None
-        return response.json()  # type: ignore[no-any-return]
+        return cached[1]
+
+    def _update_cached_playback(self, user_id: int, *, is_playing: bool | None) -> None:
+        """Patch the cached play state after play/pause, or drop it when the track changes."""
+        cached = self._playback_cache.get(user_id)
+        if cached is None:
+            return
+        playback = cached[1]
+        if is_playing is None or playback is None:
+            del self._playback_cache[user_id]
+        else:
+            self._playback_cache[user_id] = (cached[0], {**playback, "is_playing": is_playing})
 
     async def get_player(self, user_id: int) -> dict[str, Any] | None:
         """Get information about the user's current playback state."""
@@ -358,6 +514,7 @@ class SpotifyClient:
             json={"device_ids": [device_id], "play": play},
             expected_status=(204,),
         )
+        self._update_cached_playback(user_id, is_playing=None)
 
     async def _ensure_controllable_device(
         self, user_id: int, *, allow_transfer: bool
@@ -487,6 +644,8 @@ class SpotifyClient:
             params=params,
             expected_status=(204,),
         )
+        # Starting specific URIs or a context changes the track, not just the play state
+        self._update_cached_playback(user_id, is_playing=None if payload else True)
 
     async def pause(
         self, user_id: int, *, device_id: str | None = None, allow_transfer: bool = False
@@ -511,6 +670,7 @@ class SpotifyClient:
             params=params,
             expected_status=(204,),
         )
+        self._update_cached_playback(user_id, is_playing=False)
 
     async def next_track(
         self, user_id: int, *, device_id: str | None = None, allow_transfer: bool = False
@@ -535,6 +695,7 @@ class SpotifyClient:
             params=params,
             expected_status=(204,),
         )
+        self._update_cached_playback(user_id, is_playing=None)
 
     async def previous_track(
         self, user_id: int, *, device_id: str | None = None, allow_transfer: bool = False
@@ -559,6 +720,7 @@ class SpotifyClient:
             params=params,
             expected_status=(204,),
         )
+        self._update_cached_playback(user_id, is_playing=None)
 
     async def search_track(
         self,
@@ -2,15 +2,29 @@
 
 from __future__ import annotations
 
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 
+from ..config import load_settings
+from ..db import repository, schema
 from . import auth_routes, health
 
 
+@asynccontextmanager
+async def _lifespan(_: FastAPI) -> AsyncIterator[None]:
+    # Routes use pooled connections and no longer apply the schema per request
+    await schema.ensure_schema(load_settings().db_path)
+    yield
+    await auth_routes.close_clients()
+    await repository.close_pool()
+
+
 def create_web_app() -> FastAPI:
     """Create and configure the FastAPI application instance."""
 
-    app = FastAPI(title="Telegram Spotify Web API", version="0.1.0")
+    app = FastAPI(title="Telegram Spotify Web API", version="0.1.0", lifespan=_lifespan)
     app.include_router(health.router)
     app.include_router(auth_routes.router)
     return app
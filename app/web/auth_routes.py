@@ -13,7 +13,7 @@ from fastapi import APIRouter, Depends, HTTPException, Query, status
 from fastapi.responses import HTMLResponse, RedirectResponse
 
 from ..config import SPOTIFY_SCOPES, Settings, load_settings
-from ..db import repository, schema
+from ..db import repository
 from ..spotify import auth as spotify_auth
 from ..spotify.client import RepositoryTokenStore, SpotifyClient, SpotifyClientError
 
@@ -28,6 +28,33 @@ def _get_settings() -> Settings:
 SettingsDep = Annotated[Settings, Depends(_get_settings)]
 
 
+# One Telegram session and one pooled Spotify client per process, reused by every
+# authorization callback instead of being built and torn down per login.
+_notification_clients: dict[Settings, tuple[Bot, SpotifyClient]] = {}
+
+
+def _get_notification_clients(settings: Settings) -> tuple[Bot, SpotifyClient]:
+    clients = _notification_clients.get(settings)
+    if clients is None:
+        bot = Bot(
+            token=settings.telegram_bot_token,
+            default=DefaultBotProperties(parse_mode=ParseMode.HTML),
+        )
+        token_store = RepositoryTokenStore(settings.db_path)
+        spotify_client = SpotifyClient(settings=settings, token_store=token_store)
+        clients = _notification_clients[settings] = (bot, spotify_client)
+    return clients
+
+
+async def close_clients() -> None:
+    """Close the Telegram and Spotify sessions shared by the authorization callbacks."""
+
+    while _notification_clients:
+        _, (bot, spotify_client) = _notification_clients.popitem()
+        await spotify_client.aclose()
+        await bot.session.close()
+
+
 @router.get(
     "/login",
     summary="Begin Spotify authorization",
@@ -56,7 +83,6 @@ async def start_authorization(
         state = spotify_auth.generate_state()
         try:
             async with repository.connect(settings.db_path) as connection:
-                await schema.apply_schema(connection)
                 user_id = await repository.ensure_user(connection, profile)
                 await repository.insert_auth_state(
                     connection, state=state, code_verifier=code_verifier, user_id=user_id
@@ -98,7 +124,6 @@ async def authorization_callback(
 
     telegram_id: int | None = None
     async with repository.connect(settings.db_path) as connection:
-        await schema.apply_schema(connection)
         auth_state = await repository.fetch_auth_state(connection, state)
         if auth_state is None:
             raise HTTPException(
@@ -143,12 +168,9 @@ async def authorization_callback(
     # Send Telegram notification after successful authorization
     if telegram_id is not None:
         try:
-            bot = Bot(
-                token=settings.telegram_bot_token,
-                default=DefaultBotProperties(parse_mode=ParseMode.HTML),
-            )
-            token_store = RepositoryTokenStore(settings.db_path)
-            spotify_client = SpotifyClient(settings=settings, token_store=token_store)
+            bot, spotify_client = _get_notification_clients(settings)
+            # The shared client may still hold this user's previous grant
+            spotify_client.invalidate_tokens(telegram_id)
 
             # Send connection success message
             await bot.send_message(
@@ -182,9 +204,6 @@ async def authorization_callback(
                 logger.warning(
                     "Error getting currently playing track for user %s: %s", telegram_id, exc
                 )
-
-            await spotify_client.aclose()
-            await bot.session.close()
         except Exception as exc:
             logger.error("Failed to send Telegram notification: %s", exc)
 
@@ -204,24 +223,20 @@ def _format_track(payload: dict[str, Any]) -> str:
     artists = ", ".join(
         artist.get("name", "?") for artist in item.get("artists", []) if isinstance(artist, dict)
     )
-    album = (item.get("album") or {}).get("name") if isinstance(item.get("album"), dict) else None
+    album_info = item.get("album")
+    album = album_info.get("name") if isinstance(album_info, dict) else None
     external_urls = item.get("external_urls")
-    external: dict[str, Any] = external_urls if isinstance(external_urls, dict) else {}
-    url = external.get("spotify")
-    device = payload.get("device") if isinstance(payload.get("device"), dict) else None
+    url = external_urls.get("spotify") if isinstance(external_urls, dict) else None
+    device = payload.get("device")
     device_name = device.get("name") if isinstance(device, dict) else None
 
-    bits = [f"🎧 <b>{name}</b>"]
-    if artists:
-        bits.append(f"by {artists}")
-    if album:
-        bits.append(f"on {album}")
-    if device_name:
-        bits.append(f"▶️ {device_name}")
-    text = "\n".join(bits)
-    if url:
-        text += f"\n<a href='{url}'>Open in Spotify</a>"
-    return text
+    return (
+        f"🎧 <b>{name}</b>"
+        + (f"\nby {artists}" if artists else "")
+        + (f"\non {album}" if album else "")
+        + (f"\n▶️ {device_name}" if device_name else "")
+        + (f"\n<a href='{url}'>Open in Spotify</a>" if url else "")
+    )
 
 
-__all__ = ["authorization_callback", "router", "start_authorization"]
+__all__ = ["authorization_callback", "close_clients", "router", "start_authorization"]
@@ -0,0 +1,16 @@
+"""Shared pytest fixtures."""
+
+from __future__ import annotations
+
+from collections.abc import AsyncIterator
+
+import pytest_asyncio
+
+from app.db import repository
+
+
+@pytest_asyncio.fixture(autouse=True)
+async def _close_connection_pool() -> AsyncIterator[None]:
+    """Close pooled SQLite connections so their worker threads don't outlive the test."""
+    yield
+    await repository.close_pool()
@@ -0,0 +1,28 @@
+"""Tests covering the local track index used by /search."""
+
+from __future__ import annotations
+
+from app.ai.local_index import TrackIndex
+from app.ai.tracks import PlannedTrack
+
+
+def test_match_returns_longest_indexed_prefix() -> None:
+    index = TrackIndex()
+    creep = PlannedTrack(title="Creep", artist="Radiohead")
+    creep_live = PlannedTrack(title="Creep (Live)", artist="Radiohead")
+    index.insert(creep)
+    index.insert(creep_live)
+
+    assert index.match("radiohead creep") == creep
+    assert index.match("Radiohead - Creep live please") == creep_live
+    assert index.match("radiohead") is None
+    assert index.match("something by radiohead") is None
+
+
+def test_index_resets_when_full() -> None:
+    index = TrackIndex(max_tracks=1)
+    index.insert(PlannedTrack(title="Creep", artist="Radiohead"))
+    index.insert(PlannedTrack(title="Karma Police", artist="Radiohead"))
+
+    assert len(index) == 1
+    assert index.match("radiohead creep") is None
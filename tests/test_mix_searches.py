@@ -0,0 +1,85 @@
+"""Tests covering the /mix Spotify search pipeline."""
+
+from __future__ import annotations
+
+import asyncio
+from typing import Any, cast
+
+import pytest
+
+from app.ai.playlist_planner import PlannedTrack
+from app.bot import playlists
+from app.bot.playlists import _TrackSearches
+from app.spotify.client import SpotifyClient
+
+
+class _FakeSpotify:
+    def __init__(self) -> None:
+        self.queries: list[str] = []
+
+    async def search_track(self, user_id: int, *, query: str, limit: int) -> list[dict[str, Any]]:
+        self.queries.append(query)
+        await asyncio.sleep(0)
+        return [{"uri": f"spotify:track:{len(self.queries)}"}]
+
+
+@pytest.fixture(autouse=True)
+def _clear_track_uri_cache() -> None:
+    playlists._track_uri_cache.clear()
+
+
+@pytest.mark.asyncio
+async def test_results_count_final_tracks_and_share_duplicate_searches() -> None:
+    spotify = _FakeSpotify()
+    searches = _TrackSearches(cast(SpotifyClient, spotify), user_id=1)
+    discarded = PlannedTrack(title="Gone", artist="Nobody")
+    track = PlannedTrack(title="Song", artist="Artist")
+    await searches.on_track(discarded)
+    await searches.on_track(track)
+    completed = 0
+
+    def on_result() -> None:
+        nonlocal completed
+        completed += 1
+
+    try:
+        results = await searches.results([track, track], on_result=on_result)
+    finally:
+        searches.cancel()
+
+    assert completed == 2
+    assert results[0] == results[1]
+    assert spotify.queries.count("Artist Song") == 1
+
+
+@pytest.mark.asyncio
+async def test_results_share_searches_across_case_variants() -> None:
+    spotify = _FakeSpotify()
+    searches = _TrackSearches(cast(SpotifyClient, spotify), user_id=1)
+    tracks = [
+        PlannedTrack(title="Song", artist="Artist"),
+        PlannedTrack(title="song ", artist="ARTIST"),
+    ]
+
+    try:
+        results = await searches.results(tracks)
+    finally:
+        searches.cancel()
+
+    assert results[0] == results[1]
+    assert spotify.queries == ["Artist Song"]
+
+
+@pytest.mark.asyncio
+async def test_matched_uris_are_reused_across_mixes() -> None:
+    spotify = _FakeSpotify()
+    track = PlannedTrack(title="Bohemian Rhapsody", artist="Queen")
+
+    for _ in range(2):
+        searches = _TrackSearches(cast(SpotifyClient, spotify), user_id=1)
+        try:
+            assert await searches.results([track]) == ["spotify:track:1"]
+        finally:
+            searches.cancel()
+
+    assert spotify.queries == ["Queen Bohemian Rhapsody"]
@@ -1,10 +1,20 @@
-"""Unit tests for the playlist planner plain text parsing helpers."""
+"""Unit tests for the playlist planner's streamed plain text parsing."""
 
 from __future__ import annotations
 
+from collections.abc import AsyncIterator
+from types import SimpleNamespace
+from typing import Any
+
 import pytest
 
-from app.ai.playlist_planner import MAX_TRACKS, PlannedTrack, PlaylistPlannerError, _parse_tracks
+from app.ai.playlist_planner import (
+    MAX_TRACKS,
+    ClaudePlaylistPlanner,
+    PlannedTrack,
+    PlaylistPlannerError,
+)
+from app.ai.tracks import parse_track_line
 
 
 def _build_payload(count: int = MAX_TRACKS) -> str:
@@ -13,31 +23,85 @@ def _build_payload(count: int = MAX_TRACKS) -> str:
     return "\n".join(lines)
 
 
-def test_parse_tracks_success() -> None:
-    raw = _build_payload()
-    plan = _parse_tracks(raw)
+class _FakeStream:
+    def __init__(self, chunks: list[str]) -> None:
+        self._chunks = chunks
+        self.closed = False
+        self.current_message_snapshot = SimpleNamespace(stop_reason="end_turn")
 
-    assert len(plan.tracks) == MAX_TRACKS
-    assert plan.tracks[0] == PlannedTrack(title="Song 0", artist="Artist 0")
+    async def __aenter__(self) -> _FakeStream:
+        return self
 
+    async def __aexit__(self, *exc_info: object) -> None:
+        return None
 
-def test_parse_tracks_rejects_short_responses() -> None:
-    raw = _build_payload(count=MAX_TRACKS // 2 - 1)
+    async def __aiter__(self) -> AsyncIterator[SimpleNamespace]:
+        text_block = SimpleNamespace(type="text")
+        yield SimpleNamespace(type="content_block_start", content_block=text_block)
+        for chunk in self._chunks:
+            if self.closed:
+                return
+            yield SimpleNamespace(type="text", text=chunk)
 
-    with pytest.raises(PlaylistPlannerError):
-        _parse_tracks(raw)
+    async def close(self) -> None:
+        self.closed = True
+
+
+def _fake_client(stream: _FakeStream) -> Any:
+    return SimpleNamespace(messages=SimpleNamespace(stream=lambda **_: stream))
 
 
-def test_parse_tracks_accepts_minimum_tracks() -> None:
-    """Test that minimum acceptable number of tracks is accepted."""
-    raw = _build_payload(count=MAX_TRACKS // 2)
-    plan = _parse_tracks(raw)
+@pytest.mark.asyncio
+async def test_plan_parses_streamed_lines_and_stops_early() -> None:
+    payload = _build_payload(count=MAX_TRACKS + 5) + "\n"
+    # Split mid-line to make sure partial lines are buffered correctly
+    chunks = [payload[index : index + 7] for index in range(0, len(payload), 7)]
+    stream = _FakeStream(chunks)
+    seen: list[PlannedTrack] = []
+
+    async def on_track(track: PlannedTrack) -> None:
+        seen.append(track)
+
+    planner = ClaudePlaylistPlanner(_fake_client(stream), model="test-model")
+    plan = await planner.plan(context="rainy day", on_track=on_track)
+
+    assert len(plan.tracks) == MAX_TRACKS
+    assert plan.tracks[-1] == PlannedTrack(title="Song 24", artist="Artist 24")
+    assert seen == plan.tracks
+    assert stream.closed
+
+
+@pytest.mark.asyncio
+async def test_plan_parses_trailing_line_without_newline() -> None:
+    stream = _FakeStream([_build_payload(count=MAX_TRACKS // 2)])
+
+    planner = ClaudePlaylistPlanner(_fake_client(stream), model="test-model")
+    plan = await planner.plan(context="rainy day")
 
     assert len(plan.tracks) == MAX_TRACKS // 2
-    assert plan.tracks[0] == PlannedTrack(title="Song 0", artist="Artist 0")
+    assert not stream.closed
+
 
+async def _plan_from_text(raw: str) -> list[PlannedTrack]:
+    planner = ClaudePlaylistPlanner(_fake_client(_FakeStream([raw])), model="test-model")
+    plan = await planner.plan(context="rainy day")
+    return plan.tracks
 
-def test_parse_tracks_rejects_invalid_format() -> None:
-    """Test that invalid plain text format raises an error."""
+
+@pytest.mark.asyncio
+async def test_plan_rejects_short_responses() -> None:
     with pytest.raises(PlaylistPlannerError):
-        _parse_tracks("not a valid track format")
+        await _plan_from_text(_build_payload(count=MAX_TRACKS // 2 - 1))
+
+
+@pytest.mark.asyncio
+async def test_plan_rejects_invalid_format() -> None:
+    with pytest.raises(PlaylistPlannerError):
+        await _plan_from_text("not a valid track format")
+
+
+def test_parse_track_line_strips_numbering_and_keeps_hyphenated_titles() -> None:
+    assert parse_track_line("1. a-ha - Take On Me - Live\n") == PlannedTrack(
+        title="Take On Me - Live", artist="a-ha"
+    )
+    assert parse_track_line("Here are some songs:") is None
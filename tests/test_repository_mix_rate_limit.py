@@ -0,0 +1,70 @@
+"""Tests covering /mix admission in the repository."""
+
+from __future__ import annotations
+
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+from app.db import repository, schema
+
+
+@pytest.mark.asyncio
+async def test_try_admit_mix_enforces_processing_and_cooldown(tmp_path: Path) -> None:
+    db_path = tmp_path / "app.db"
+    await schema.ensure_schema(db_path)
+    now = datetime(2025, 1, 1, 12, 0, tzinfo=UTC)
+
+    async with repository.connect(db_path) as connection:
+        user_id = await repository.ensure_user(
+            connection, repository.UserProfile(telegram_id=12345)
+        )
+
+        first = await repository.try_admit_mix(connection, user_id=user_id, now=now)
+        assert first.allowed
+        assert first.request_date == "2025-01-01"
+
+        busy = await repository.try_admit_mix(
+            connection, user_id=user_id, now=now + timedelta(seconds=5)
+        )
+        assert not busy.allowed
+        assert busy.reason is not None and "previous one" in busy.reason
+
+        # The cooldown runs from when the mix finished, not when it was admitted
+        await repository.finalize_mix(
+            connection,
+            user_id=user_id,
+            request_date=first.request_date,
+            now=now + timedelta(seconds=5),
+        )
+        cooling = await repository.try_admit_mix(
+            connection, user_id=user_id, now=now + timedelta(seconds=10)
+        )
+        assert not cooling.allowed
+        assert cooling.reason is not None and "Wait 25s" in cooling.reason
+
+        later = await repository.try_admit_mix(
+            connection, user_id=user_id, now=now + timedelta(seconds=36)
+        )
+        assert later.allowed
+
+        cursor = await connection.execute("SELECT request_count FROM mix_rate_limits")
+        row = await cursor.fetchone()
+        await cursor.close()
+        assert row is not None and row["request_count"] == 2
+
+
+@pytest.mark.asyncio
+async def test_try_admit_mix_defaults_to_today(tmp_path: Path) -> None:
+    db_path = tmp_path / "app.db"
+    await schema.ensure_schema(db_path)
+
+    async with repository.connect(db_path) as connection:
+        user_id = await repository.ensure_user(
+            connection, repository.UserProfile(telegram_id=12345)
+        )
+        result = await repository.try_admit_mix(connection, user_id=user_id)
+
+    assert result.allowed
+    assert result.request_date == datetime.now(UTC).date().isoformat()
@@ -0,0 +1,38 @@
+"""Tests covering the cached playlist plan repository helpers."""
+
+from __future__ import annotations
+
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+from app.db import repository, schema
+
+
+@pytest.mark.asyncio
+async def test_playlist_plan_expires_and_is_pruned(tmp_path: Path) -> None:
+    db_path = tmp_path / "app.db"
+    await schema.ensure_schema(db_path)
+    now = datetime(2025, 1, 2, 12, 0, tzinfo=UTC)
+    ttl = timedelta(hours=24)
+
+    async with repository.connect(db_path) as connection:
+        await repository.store_playlist_plan(
+            connection,
+            plan_key="old",
+            plan_json="[]",
+            now=now - 2 * ttl,
+            prune_before=now - 3 * ttl,
+        )
+        await repository.store_playlist_plan(
+            connection, plan_key="new", plan_json='[["A", "B"]]', now=now, prune_before=now - ttl
+        )
+        await connection.commit()
+
+        assert await repository.get_playlist_plan(connection, "new", not_before=now - ttl) == (
+            '[["A", "B"]]'
+        )
+        assert (
+            await repository.get_playlist_plan(connection, "old", not_before=now - 3 * ttl) is None
+        )
@@ -0,0 +1,49 @@
+"""Tests covering user repository helpers."""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from app.db import repository, schema
+
+
+@pytest.mark.asyncio
+async def test_ensure_user_inserts_then_updates_in_place(tmp_path: Path) -> None:
+    db_path = tmp_path / "app.db"
+    await schema.ensure_schema(db_path)
+
+    async with repository.connect(db_path) as connection:
+        user_id = await repository.ensure_user(
+            connection, repository.UserProfile(telegram_id=42, username="before")
+        )
+        same_id = await repository.ensure_user(
+            connection, repository.UserProfile(telegram_id=42, username="after")
+        )
+        await connection.commit()
+
+        cursor = await connection.execute("SELECT username FROM users WHERE id = ?", (user_id,))
+        row = await cursor.fetchone()
+        await cursor.close()
+
+    assert same_id == user_id
+    assert row is not None
+    assert row["username"] == "after"
+
+
+@pytest.mark.asyncio
+async def test_transaction_rolls_back_on_error(tmp_path: Path) -> None:
+    db_path = tmp_path / "app.db"
+    await schema.ensure_schema(db_path)
+
+    with pytest.raises(RuntimeError):
+        async with (
+            repository.connect(db_path) as connection,
+            repository.transaction(connection),
+        ):
+            await repository.ensure_user(connection, repository.UserProfile(telegram_id=7))
+            raise RuntimeError("boom")
+
+    async with repository.connect(db_path) as connection:
+        assert await repository.get_user_id_by_telegram_id(connection, 7) is None
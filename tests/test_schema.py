@@ -0,0 +1,68 @@
+"""Tests covering schema application and migration."""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+import aiosqlite
+import pytest
+
+from app.db import repository, schema
+
+
+@pytest.mark.asyncio
+async def test_ensure_schema_rebuilds_rowid_tables_without_losing_rows(tmp_path: Path) -> None:
+    db_path = tmp_path / "app.db"
+    async with aiosqlite.connect(str(db_path)) as connection:
+        # The pre-WITHOUT ROWID layout of the clustered tables
+        await connection.executescript(
+            """
+            CREATE TABLE users (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                telegram_id INTEGER NOT NULL UNIQUE,
+                username TEXT,
+                first_name TEXT,
+                last_name TEXT,
+                created_at TEXT NOT NULL DEFAULT (datetime('now')),
+                updated_at TEXT NOT NULL DEFAULT (datetime('now'))
+            );
+            CREATE TABLE auth_states (
+                state TEXT PRIMARY KEY,
+                user_id INTEGER,
+                code_verifier TEXT NOT NULL,
+                created_at TEXT NOT NULL DEFAULT (datetime('now'))
+            );
+            CREATE TABLE mix_rate_limits (
+                user_id INTEGER NOT NULL,
+                request_date TEXT NOT NULL,
+                request_count INTEGER NOT NULL DEFAULT 0,
+                last_request_at INTEGER,
+                processing_until INTEGER,
+                PRIMARY KEY (user_id, request_date)
+            );
+            INSERT INTO users (telegram_id) VALUES (1);
+            INSERT INTO auth_states (state, user_id, code_verifier) VALUES ('s', 1, 'v');
+            INSERT INTO mix_rate_limits (user_id, request_date, request_count)
+            VALUES (1, '2026-01-01', 3);
+            """
+        )
+
+    await schema.ensure_schema(db_path)
+    await schema.ensure_schema(db_path)  # idempotent once migrated
+
+    async with repository.connect(db_path) as connection:
+        rows = await connection.execute_fetchall(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'table'"
+        )
+        tables = {name: sql for name, sql in rows}
+        state = await repository.fetch_auth_state(connection, "s")
+        count = await connection.execute_fetchall(
+            "SELECT request_count FROM mix_rate_limits WHERE user_id = 1"
+        )
+
+    for name in schema.CLUSTERED_TABLES:
+        assert "WITHOUT ROWID" in tables[name]
+        assert f"{name}_rowid" not in tables
+    assert state is not None
+    assert state.code_verifier == "v"
+    assert [row[0] for row in count] == [3]
@@ -0,0 +1,75 @@
+"""Tests covering the cached Spotify token store."""
+
+from __future__ import annotations
+
+from datetime import UTC, datetime
+from pathlib import Path
+
+import pytest
+
+from app.db import repository, schema
+from app.spotify.client import RepositoryTokenStore
+
+
+async def _write_tokens(db_path: Path, user_id: int, access_token: str) -> None:
+    async with repository.connect(db_path) as connection:
+        await repository.upsert_spotify_tokens(
+            connection,
+            user_id=user_id,
+            access_token=access_token,
+            refresh_token="refresh",
+            scope="user-read-playback-state",
+            token_type="Bearer",
+            expires_at=datetime(2030, 1, 1, tzinfo=UTC),
+        )
+        await connection.commit()
+
+
+@pytest.mark.asyncio
+async def test_token_store_cache_can_be_bypassed_and_invalidated(tmp_path: Path) -> None:
+    db_path = tmp_path / "app.db"
+    await schema.ensure_schema(db_path)
+    async with repository.connect(db_path) as connection:
+        user_id = await repository.ensure_user(
+            connection, repository.UserProfile(telegram_id=12345)
+        )
+        await connection.commit()
+    store = RepositoryTokenStore(db_path)
+
+    await _write_tokens(db_path, user_id, "first")
+    assert (tokens := await store.load_by_telegram_id(12345)) is not None
+    assert tokens.access_token == "first"
+
+    # Written behind the store's back, e.g. by the web process
+    await _write_tokens(db_path, user_id, "second")
+    assert (tokens := await store.load_by_telegram_id(12345)) is not None
+    assert tokens.access_token == "first"
+    assert (tokens := await store.load_by_telegram_id(12345, fresh=True)) is not None
+    assert tokens.access_token == "second"
+
+    await _write_tokens(db_path, user_id, "third")
+    store.invalidate(user_id)
+    assert (tokens := await store.load_by_telegram_id(12345)) is not None
+    assert tokens.access_token == "third"
+
+
+@pytest.mark.asyncio
+async def test_token_store_remembers_internal_user_ids(tmp_path: Path) -> None:
+    db_path = tmp_path / "app.db"
+    await schema.ensure_schema(db_path)
+    async with repository.connect(db_path) as connection:
+        user_id = await repository.ensure_user(
+            connection, repository.UserProfile(telegram_id=12345)
+        )
+        await connection.commit()
+    await _write_tokens(db_path, user_id, "first")
+    store = RepositoryTokenStore(db_path)
+    assert await store.load_by_telegram_id(12345) is not None
+
+    async with repository.connect(db_path) as connection:
+        await connection.execute("UPDATE users SET telegram_id = 0 WHERE id = ?", (user_id,))
+        await connection.commit()
+
+    # The Telegram -> internal id mapping is served from memory, even on a fresh token read
+    assert (tokens := await store.load_by_telegram_id(12345, fresh=True)) is not None
+    assert tokens.user_id == user_id
@@ -0,0 +1,28 @@
+"""Unit tests for the Claude-backed track searcher helpers."""
+
+from __future__ import annotations
+
+import pytest
+
+from app.ai.playlist_planner import PlannedTrack
+from app.ai.track_searcher import TrackSearcherError, _parse_tracks
+
+
+def test_parse_tracks_handles_numbering_and_hyphens() -> None:
+    raw = "```\n1. Queen - Bohemian Rhapsody\nnot a track\n2) a-ha - Take On Me - Live\n```"
+
+    assert _parse_tracks(raw) == [
+        PlannedTrack(title="Bohemian Rhapsody", artist="Queen"),
+        PlannedTrack(title="Take On Me - Live", artist="a-ha"),
+    ]
+
+
+def test_parse_tracks_skips_preamble_before_blank_line() -> None:
+    raw = "Here are some matches:\n\nQueen - Bohemian Rhapsody"
+
+    assert _parse_tracks(raw) == [PlannedTrack(title="Bohemian Rhapsody", artist="Queen")]
+
+
+def test_parse_tracks_rejects_unparseable_response() -> None:
+    with pytest.raises(TrackSearcherError):
+        _parse_tracks("Sorry, I couldn't find that song.")